@@ -0,0 +1,69 @@
+"""Per-keystroke latency of FuzzyMatcher while typing fuzzy queries against
+vocabularies of growing size. Every search runs to completion.
+
+Run from the repository root, as python benchmarks/fuzzy_bench.py or
+python -m benchmarks.fuzzy_bench.
+"""
+
+import os
+import random
+import string
+import sys
+import time
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.fuzzy import FuzzyMatcher
+
+
+QUERIES = ["gcv", "rdfl", "snmq", "tbx"]
+SIZES = (5000, 20000, 50000, 100000)
+
+
+def random_identifier(rnd):
+    parts = ["".join(rnd.choice(string.ascii_lowercase) for _ in range(rnd.randint(2, 7))) for _ in range(rnd.randint(1, 4))]
+    if rnd.random() < 0.5:
+        return "_".join(parts)
+    return parts[0] + "".join(part.title() for part in parts[1:])
+
+
+def main():
+    rnd = random.Random(7)
+    print(f"{'vocabulary':>10} {'index':>10} {'first key':>10} {'next keys':>10} {'backspace':>10}")
+    for size in SIZES:
+        vocab = set()
+        while len(vocab) < size:
+            vocab.add(random_identifier(rnd))
+        vocab = list(vocab)
+        matcher = FuzzyMatcher()
+        start = time.perf_counter()
+        matcher.prepare(vocab)
+        indexing = time.perf_counter() - start
+
+        first = following = backspace = 0.0
+        following_count = 0
+        for query in QUERIES:
+            for length in range(1, len(query) + 1):
+                start = time.perf_counter()
+                matcher.match(query[:length], vocab)
+                elapsed = time.perf_counter() - start
+                if length == 1:
+                    first += elapsed
+                else:
+                    following += elapsed
+                    following_count += 1
+            start = time.perf_counter()
+            matcher.match(query[:-1], vocab)
+            backspace += time.perf_counter() - start
+
+        print(
+            f"{size:>10} {indexing * 1000:>8.1f}ms"
+            f" {first / len(QUERIES) * 1000:>8.2f}ms"
+            f" {following / following_count * 1000:>8.2f}ms"
+            f" {backspace / len(QUERIES) * 1000:>8.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,7 @@ DEFAULT_CONFIG = {
         "font_size": 12,
         "show_line_numbers": True,
         "word_wrap": False,
+        "fsync_on_save": True,
     },
     "autocomplete": {
         "enabled": True,
@@ -21,6 +22,20 @@ DEFAULT_CONFIG = {
     },
     "python": {
         "auto_imports": True,
+        "unbuffered_run": True,
+        "fork_server": False,
+        "preload_modules": "",
+    },
+    "terminal": {
+        "use_pty": True,
+    },
+    "run": {
+        "max_concurrent": 2,
+    },
+    "output": {
+        "max_lines": 10000,
+        "log_to_file": False,
+        "timestamps": False,
     },
     "venv": {
         "auto_create": True,
@@ -36,7 +51,7 @@ DEFAULT_CONFIG = {
         "ruby": {"path": ""},
         "php": {"path": ""},
         "perl": {"path": ""},
-        "cpp": {"path": ""},
+        "cpp": {"path": "", "flags": ""},
         "html": {"path": ""},
     },
     "workspace": {
@@ -115,6 +115,8 @@ class LanguageRegistry:
             "functions": config.get("functions", []),
             "comment_prefix": config.get("comment_prefix", "#"),
             "string_quotes": config.get("string_quotes", ["\"", "'"]),
+            "block_comment": config.get("block_comment"),
+            "multiline_strings": config.get("multiline_strings", []),
             "number_pattern": config.get("number_pattern", r"\b\d+(\.\d+)?\b"),
         }
 
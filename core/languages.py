@@ -18,6 +18,8 @@ LANGUAGES = {
         "functions": ["print", "pairs", "ipairs", "next", "type", "tostring", "tonumber", "table", "string", "math", "io", "os", "require", "pcall", "xpcall", "error", "assert"],
         "comment_prefix": "--",
         "string_quotes": ["\"", "\'"],
+        "block_comment": ["--[[", "]]"],
+        "multiline_strings": [["[[", "]]"]],
         "number_pattern": r'\b\d+(\.\d+)?\b'
     },
     "python": {
@@ -35,7 +37,8 @@ LANGUAGES = {
         "keywords": ["def", "class", "if", "elif", "else", "for", "while", "try", "except", "finally", "with", "as", "import", "from", "return", "yield", "break", "continue", "pass", "lambda", "and", "or", "not", "in", "is", "True", "False", "None"],
         "functions": ["print", "len", "range", "enumerate", "zip", "map", "filter", "sorted", "sum", "max", "min", "abs", "round", "int", "float", "str", "list", "dict", "set", "tuple", "type", "isinstance", "hasattr", "getattr", "setattr"],
         "comment_prefix": "#",
-        "string_quotes": ["\"", "\\'", "\"\"\"", "\\'\\'\\'"],
+        "string_quotes": ["\"", "\'", "\"\"\"", "\'\'\'"],
+        "multiline_strings": [["\"\"\"", "\"\"\""], ["\'\'\'", "\'\'\'"]],
         "number_pattern": r'\b\d+(\.\d+)?\b'
     },
     "javascript": {
@@ -53,7 +56,9 @@ LANGUAGES = {
         "keywords": ["function", "var", "let", "const", "if", "else", "for", "while", "do", "switch", "case", "default", "break", "continue", "return", "try", "catch", "finally", "throw", "new", "this", "class", "extends", "import", "export", "async", "await", "true", "false", "null", "undefined"],
         "functions": ["console.log", "parseInt", "parseFloat", "isNaN", "isFinite", "setTimeout", "setInterval", "clearTimeout", "clearInterval", "JSON.parse", "JSON.stringify", "Object.keys", "Object.values", "Array.isArray"],
         "comment_prefix": "//",
-        "string_quotes": ["\"", "\\'", "`"],
+        "string_quotes": ["\"", "\'", "`"],
+        "block_comment": ["/*", "*/"],
+        "multiline_strings": [["`", "`"]],
         "number_pattern": r'\b\d+(\.\d+)?\b'
     },
     "ruby": {
@@ -90,6 +95,7 @@ LANGUAGES = {
         "functions": ["echo", "print", "var_dump", "print_r", "strlen", "substr", "strpos", "str_replace", "explode", "implode", "array", "count", "is_array", "isset", "empty", "unset", "include", "require", "include_once", "require_once"],
         "comment_prefix": "//",
         "string_quotes": ["\"", "\'"],
+        "block_comment": ["/*", "*/"],
         "number_pattern": r'\b\d+(\.\d+)?\b'
     },
     "perl": {
@@ -125,6 +131,7 @@ LANGUAGES = {
         "functions": ["main", "printf", "scanf", "cout", "cin", "endl", "vector", "string", "map", "set", "push_back", "size", "begin", "end"],
         "comment_prefix": "//",
         "string_quotes": ["\"", "\'"],
+        "block_comment": ["/*", "*/"],
         "number_pattern": r'\b\d+(\.\d+)?\b'
     },
     "html": {
@@ -143,6 +150,7 @@ LANGUAGES = {
         "functions": ["id", "class", "href", "src", "alt", "style", "type", "value", "name", "target", "rel", "charset"],
         "comment_prefix": "<!--",
         "string_quotes": ["\"", "\'"],
+        "block_comment": ["<!--", "-->"],
         "number_pattern": r'\b\d+(\.\d+)?\b'
     }
 }
@@ -1,9 +1,11 @@
+import multiprocessing
 import sys
 
 from PySide6.QtWidgets import QApplication
 
 from core.config import ConfigManager
 from ui.main_window import MainWindow
+from utils.pty_terminal import LOGIN_TTY_FLAG, login_tty_main
 
 
 def main():
@@ -22,4 +24,9 @@ def main():
 
 
 if __name__ == "__main__":
+    # Frozen builds start terminal programs through themselves.
+    if len(sys.argv) > 2 and sys.argv[1] == LOGIN_TTY_FLAG:
+        login_tty_main(sys.argv[2:])
+    # The workspace indexer uses a process pool; frozen builds need this.
+    multiprocessing.freeze_support()
     main()
@@ -5,7 +5,7 @@ a = Analysis(
     ['main.py'],
     pathex=[],
     binaries=[],
-    datas=[],
+    datas=[('utils/fork_server.py', 'utils')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
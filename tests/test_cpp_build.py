@@ -0,0 +1,49 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from utils.cpp_build import CppBuild
+
+
+@unittest.skipUnless(shutil.which("g++"), "g++ not found")
+class CppBuildTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        os.makedirs(os.path.join(self.folder, "include"))
+        os.makedirs(os.path.join(self.folder, "src"))
+        self.write("src/main.cpp", '#include "config.h"\n#include <cstdio>\nint main() { std::printf("%d\\n", VALUE); }\n')
+        self.write("include/config.h", "#define VALUE 1\n")
+
+    def write(self, name, text):
+        with open(os.path.join(self.folder, name), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def build_and_run(self):
+        output = []
+        build = CppBuild(
+            "g++",
+            ["-I" + os.path.join(self.folder, "include")],
+            os.path.join(self.folder, "cache"),
+            write=output.append,
+        )
+        program = os.path.join(self.folder, "main.out")
+        self.assertEqual(build.build(os.path.join(self.folder, "src", "main.cpp"), program), 0, "".join(output))
+        return subprocess.run([program], capture_output=True, text=True).stdout.strip(), "".join(output)
+
+    def test_header_found_through_include_flag_invalidates_object(self):
+        self.assertEqual(self.build_and_run()[0], "1")
+        value, output = self.build_and_run()
+        self.assertEqual(value, "1")
+        self.assertIn("0 compiled, 1 cached", output)
+
+        self.write("include/config.h", "#define VALUE 2\n")
+        value, output = self.build_and_run()
+        self.assertEqual(value, "2")
+        self.assertIn("1 compiled, 0 cached", output)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,49 @@
 import re
-from collections import Counter
+import threading
+import time
+from contextlib import contextmanager
 
-from PySide6.QtCore import QRect, QSize, Qt, QStringListModel, QTimer
-from PySide6.QtGui import QColor, QFont, QKeyEvent, QPainter, QSyntaxHighlighter, QTextCharFormat, QTextCursor, QTextFormat
+from PySide6.QtCore import QRect, QSize, Qt, QStringListModel, QTimer, Signal
+from PySide6.QtGui import (
+    QColor,
+    QFont,
+    QKeyEvent,
+    QPainter,
+    QSyntaxHighlighter,
+    QTextCharFormat,
+    QTextCursor,
+    QTextFormat,
+)
 from PySide6.QtWidgets import QCompleter, QPlainTextEdit, QTextEdit, QWidget
 
 from core.languages import LANGUAGES
 from core.themes import THEMES, UI_CONFIG
+from utils.tokenizer import (
+    STATE_DEFAULT,
+    TOKEN_COMMENT,
+    TOKEN_FUNCTION,
+    TOKEN_KEYWORD,
+    TOKEN_NUMBER,
+    TOKEN_STRING,
+    get_tokenizer,
+)
+from utils.background import CoalescingWorker
+from utils.brackets import BRACKET_PAIRS, OPENERS, bracket_record, scan_record
+from utils.completion_index import CompletionIndex
+from utils.fuzzy import FuzzyMatcher, fuzzy_scores
+from utils.usage_stats import UsageStats
+from utils.vocabulary import get_vocabulary
+from utils.word_index import WordIndex
+
+
+# Documents with at least this many blocks are highlighted viewport-first,
+# with the remainder processed in idle-time slices of LAZY_HIGHLIGHT_SLICE_MS.
+LAZY_HIGHLIGHT_MIN_BLOCKS = 3000
+LAZY_HIGHLIGHT_MARGIN = 60
+LAZY_HIGHLIGHT_SLICE_MS = 6
+# A fuzzy search still running after this long shows what it found so far,
+# then goes on in slices of the same length until it has checked every word.
+FUZZY_SLICE_MS = 30
 
 
 class LineNumberArea(QWidget):
@@ -22,90 +59,344 @@ class LineNumberArea(QWidget):
 
 
 class CodeHighlighter(QSyntaxHighlighter):
-    def __init__(self, document, language_config, theme):
-        super().__init__(document)
-        self.language_config = language_config
+    # Emitted from the tokenizer thread: (generation, tokenizer, entries).
+    tokens_ready = Signal(int, object, object)
+
+    def __init__(self, document, language_id, theme):
+        # Attach the document only after our contentsChange slot is connected,
+        # so the block cache is realigned before Qt re-highlights an edit.
+        super().__init__(None)
+        self.language_id = language_id
+        self.tokenizer = get_tokenizer(language_id)
         self.theme = theme
         self._init_formats()
 
+        # Lazy mode: blocks before _frontier and inside _priority are
+        # highlighted, the rest are left for the idle-time sweep.
+        self._lazy = False
+        self._deferring = False
+        self._frontier = 0
+        self._priority = (0, -1)
+        self._lazy_timer = QTimer(self)
+        self._lazy_timer.setInterval(0)
+        self._lazy_timer.timeout.connect(self._highlight_slice)
+
+        # One (text, start_state, spans, end_state) entry per block, filled
+        # either by highlightBlock or by the background tokenizer.
+        self._block_cache = [None] * document.blockCount()
+        # Parallel to _block_cache: (entry, bracket record) pairs, valid while
+        # the entry is still the one in _block_cache.
+        self._bracket_cache = [None] * document.blockCount()
+        self._generation = 0
+        # First block edited since the pending snapshot was taken.
+        self._edited_from = None
+        self._tokens_pending = False
+        self.tokens_ready.connect(self._on_tokens_ready)
+
+        document.contentsChange.connect(self._on_contents_change)
+        self.setDocument(document)
+
     def _init_formats(self):
         syntax = self.theme["syntax"]
+        self._formats = {}
+        for token_type in (TOKEN_KEYWORD, TOKEN_FUNCTION, TOKEN_COMMENT, TOKEN_STRING, TOKEN_NUMBER):
+            fmt = QTextCharFormat()
+            fmt.setForeground(QColor(syntax[token_type]))
+            self._formats[token_type] = fmt
 
-        self.keyword_format = QTextCharFormat()
-        self.keyword_format.setForeground(QColor(syntax["keyword"]))
+    def set_config(self, language_id, theme):
+        tokenizer = get_tokenizer(language_id)
+        if tokenizer is not self.tokenizer:
+            self._block_cache = [None] * self.document().blockCount()
+            self._bracket_cache = [None] * self.document().blockCount()
+        self.language_id = language_id
+        self.tokenizer = tokenizer
+        self.set_theme(theme)
 
-        self.function_format = QTextCharFormat()
-        self.function_format.setForeground(QColor(syntax["function"]))
+    def set_theme(self, theme):
+        """Swap the color palette, keeping the cached tokens.
 
-        self.comment_format = QTextCharFormat()
-        self.comment_format.setForeground(QColor(syntax["comment"]))
+        Returns True when the syntax colors changed and the formats have to
+        be re-applied to the document.
+        """
+        changed = theme.get("syntax") != self.theme.get("syntax")
+        self.theme = theme
+        if changed:
+            self._init_formats()
+        return changed
 
-        self.string_format = QTextCharFormat()
-        self.string_format.setForeground(QColor(syntax["string"]))
+    def rehighlight(self):
+        self._lazy_timer.stop()
+        self._lazy = False
+        self._deferring = False
+        with self._signals_blocked():
+            super().rehighlight()
 
-        self.number_format = QTextCharFormat()
-        self.number_format.setForeground(QColor(syntax["number"]))
+    def defer_all(self):
+        """Stop highlighting new blocks until schedule_rehighlight is called."""
+        self._lazy_timer.stop()
+        self._lazy = True
+        self._deferring = True
+        self._frontier = 0
+        self._priority = (0, -1)
 
-    def set_config(self, language_config, theme):
-        self.language_config = language_config
-        self.theme = theme
-        self._init_formats()
+    def schedule_rehighlight(self, first, last, lines=None):
+        """Highlight blocks first..last now and the rest during idle time.
 
-    def _apply_word_list(self, text, words, fmt):
-        for word in words:
-            for match in re.finditer(r"\\b" + re.escape(word) + r"\\b", text):
-                self.setFormat(match.start(), match.end() - match.start(), fmt)
+        Blocks without cached tokens are tokenized on a worker thread first;
+        the idle-time sweep then only has to apply spans. lines, when the
+        caller already has the document's lines, spares copying its text.
+        """
+        self._lazy = True
+        self._deferring = False
+        self._frontier = 0
+        self.prioritize(first, last)
+        if None in self._block_cache:
+            self._request_tokens(lines)
+        else:
+            self._lazy_timer.start()
 
-    def highlightBlock(self, text):
-        if not self.language_config:
+    def prioritize(self, first, last):
+        if not self._lazy:
             return
+        self._priority = (first, last)
+        block = self.document().findBlockByNumber(max(first, self._frontier))
+        with self._signals_blocked():
+            while block.isValid() and block.blockNumber() <= last:
+                self.rehighlightBlock(block)
+                block = block.next()
 
-        self._apply_word_list(text, self.language_config.get("keywords", []), self.keyword_format)
-        self._apply_word_list(text, self.language_config.get("functions", []), self.function_format)
+    def is_lazy(self):
+        return self._lazy
 
-        number_pattern = self.language_config.get("number_pattern")
-        if number_pattern:
-            for match in re.finditer(number_pattern, text):
-                self.setFormat(match.start(), match.end() - match.start(), self.number_format)
+    def bracket_record_at(self, number):
+        """Bracket summary of a block, ignoring brackets in strings/comments."""
+        entry = self._block_cache[number] if number < len(self._block_cache) else None
+        if entry is None:
+            # Not tokenized yet (lazy highlighting); summarize it directly.
+            block = self.document().findBlockByNumber(number)
+            previous = block.previous()
+            state = previous.userState() if previous.isValid() else STATE_DEFAULT
+            return bracket_record(block.text(), self.block_spans(block, state))
+        cached = self._bracket_cache[number]
+        if cached is not None and cached[0] is entry:
+            return cached[1]
+        record = bracket_record(entry[0], entry[2])
+        self._bracket_cache[number] = (entry, record)
+        return record
 
-        for quote in self.language_config.get("string_quotes", []):
-            if quote in ["\"\"\"", "'''"]:
-                continue
-            pattern = re.escape(quote) + r".*?" + re.escape(quote)
-            for match in re.finditer(pattern, text):
-                self.setFormat(match.start(), match.end() - match.start(), self.string_format)
-
-        comment_prefix = self.language_config.get("comment_prefix")
-        if comment_prefix:
-            if comment_prefix == "<!--":
-                idx = text.find("<!--")
-                if idx != -1:
-                    self.setFormat(idx, len(text) - idx, self.comment_format)
+    def find_bracket_partner(self, number, column, bracket):
+        """Return (block number, column) of the bracket matching the one at
+        column of block number, or None.
+
+        Blocks whose cached balance cannot bring the depth to zero are
+        skipped without looking at their brackets.
+        """
+        forward = bracket in OPENERS
+        opener = bracket if bracket in OPENERS else BRACKET_PAIRS[bracket]
+        match, depth = scan_record(self.bracket_record_at(number), bracket, 1, forward, column)
+        if match is not None:
+            return number, match
+        step = 1 if forward else -1
+        count = len(self._block_cache)
+        block_cache = self._block_cache
+        bracket_cache = self._bracket_cache
+        number += step
+        while 0 <= number < count:
+            cached = bracket_cache[number]
+            if cached is not None and cached[0] is block_cache[number]:
+                record = cached[1]
             else:
-                idx = text.find(comment_prefix)
-                if idx != -1:
-                    self.setFormat(idx, len(text) - idx, self.comment_format)
+                record = self.bracket_record_at(number)
+            balance = record[2].get(opener)
+            if balance is not None:
+                # Searching forward from an opener, unmatched closers lower the
+                # depth; searching backward from a closer, unmatched openers do.
+                consumed, added = balance if forward else (balance[1], balance[0])
+                if depth > consumed:
+                    depth += added - consumed
+                else:
+                    match, depth = scan_record(record, bracket, depth, forward)
+                    return number, match
+            number += step
+        return None
+
+    def block_spans(self, block, state):
+        """Token spans of block, taken from the cache when it is current.
+
+        state is the block's start state, or -1 when the previous block has
+        not been highlighted yet.
+        """
+        if not self.tokenizer:
+            return []
+        text = block.text()
+        number = block.blockNumber()
+        cache = self._block_cache
+        entry = cache[number] if number < len(cache) else None
+        if entry is not None and entry[0] == text and (state < 0 or entry[1] == state):
+            return entry[2]
+        spans, _ = self.tokenizer.tokenize(text, max(state, STATE_DEFAULT))
+        return spans
+
+    def _request_tokens(self, lines=None):
+        if self._tokens_pending or not self.tokenizer:
+            return
+        self._tokens_pending = True
+        self._edited_from = None
+        text = self.document().toPlainText() if lines is None else None
+        args = (self._generation, self.tokenizer, text, lines)
+        threading.Thread(target=self._tokenize_snapshot, args=args, daemon=True).start()
+
+    def _tokenize_snapshot(self, generation, tokenizer, text, lines):
+        entries = tokenizer.tokenize_lines(text.split("\n") if lines is None else lines)
+        try:
+            self.tokens_ready.emit(generation, tokenizer, entries)
+        except RuntimeError:
+            # The editor was closed while the snapshot was being tokenized.
+            pass
+
+    def _on_tokens_ready(self, generation, tokenizer, entries):
+        self._tokens_pending = False
+        if not self._lazy:
+            return
+        if tokenizer is not self.tokenizer:
+            # The language changed since the snapshot was taken.
+            self._request_tokens()
+            return
+        if generation == self._generation and len(entries) == len(self._block_cache):
+            self._block_cache = entries
+            self._bracket_cache = [None] * len(entries)
+        else:
+            self._merge_entries(entries)
+        self._lazy_timer.start()
+
+    def _merge_entries(self, entries):
+        # The document was edited while the snapshot was tokenized. Blocks
+        # before the first edit keep their numbers and blocks after it are
+        # aligned from the end; highlightBlock re-tokenizes any entry whose
+        # text or start state no longer match.
+        cache = self._block_cache
+        edited_from = min(self._edited_from or 0, len(cache), len(entries))
+        offset = len(cache) - len(entries)
+        for number in range(len(cache)):
+            if cache[number] is not None:
+                continue
+            if number < edited_from:
+                cache[number] = entries[number]
+            elif edited_from <= number - offset < len(entries):
+                cache[number] = entries[number - offset]
+
+    def _highlight_slice(self):
+        deadline = time.perf_counter() + LAZY_HIGHLIGHT_SLICE_MS / 1000.0
+        block = self.document().findBlockByNumber(self._frontier)
+        with self._signals_blocked():
+            while block.isValid():
+                self._frontier = block.blockNumber() + 1
+                self.rehighlightBlock(block)
+                block = block.next()
+                if time.perf_counter() >= deadline:
+                    break
+        if not block.isValid():
+            self._lazy = False
+            self._lazy_timer.stop()
+
+    @contextmanager
+    def _signals_blocked(self):
+        # Applying formats marks the document dirty, which would emit
+        # textChanged on the editor once per block.
+        document = self.document()
+        previous = document.blockSignals(True)
+        try:
+            yield
+        finally:
+            document.blockSignals(previous)
+
+    def _on_contents_change(self, position, _removed, added):
+        self._generation += 1
+        document = self.document()
+        first = document.findBlock(position).blockNumber()
+        if self._tokens_pending:
+            edited = max(first, 0)
+            self._edited_from = edited if self._edited_from is None else min(self._edited_from, edited)
+        if first < 0:
+            self._block_cache = [None] * document.blockCount()
+            self._bracket_cache = [None] * document.blockCount()
+            return
+
+        # Keep the caches aligned with block numbers when lines are added or
+        # removed; entries for edited blocks are refreshed by highlightBlock.
+        delta = document.blockCount() - len(self._block_cache)
+        for cache in (self._block_cache, self._bracket_cache):
+            if delta > 0:
+                cache[first + 1:first + 1] = [None] * delta
+            elif delta < 0:
+                del cache[first + 1:first + 1 - delta]
+        last = document.findBlock(min(position + added, document.characterCount() - 1)).blockNumber()
+        if last >= first:
+            self._block_cache[first:last + 1] = [None] * (last - first + 1)
+
+        # Blocks past the frontier move with the added or removed lines;
+        # edited blocks before it are re-highlighted by Qt right away.
+        if self._lazy and first < self._frontier:
+            self._frontier = max(self._frontier + delta, first)
+
+    def highlightBlock(self, text):
+        if not self.tokenizer:
+            return
+
+        if self._deferring:
+            return
+        number = self.currentBlock().blockNumber()
+        if self._lazy:
+            first, last = self._priority
+            if number >= self._frontier and not (first <= number <= last):
+                return
+
+        # Qt only moves on to the next block when the state set here differs
+        # from the one stored last time, so edits stay local unless they open
+        # or close a multi-line string/comment.
+        state = max(self.previousBlockState(), STATE_DEFAULT)
+        cache = self._block_cache
+        entry = cache[number] if number < len(cache) else None
+        if entry is not None and entry[1] == state and entry[0] == text:
+            spans, end_state = entry[2], entry[3]
+        else:
+            spans, end_state = self.tokenizer.tokenize(text, state)
+            if number < len(cache):
+                cache[number] = (text, state, spans, end_state)
+
+        formats = self._formats
+        for start, length, token_type in spans:
+            self.setFormat(start, length, formats[token_type])
+        self.setCurrentBlockState(end_state)
 
 
 class Editor(QPlainTextEdit):
+    completions_ready = Signal(int, object)
+    # Emitted from a vocabulary build thread; handled on the GUI thread.
+    vocabulary_rebuilt = Signal()
+
     def __init__(self, config_manager, parent=None):
         super().__init__(parent)
         self.config_manager = config_manager
         self.current_language = self.config_manager.get("current_language") or "python"
         self._snippets = {}
-        self._doc_words = set()
-        self._doc_word_counts = {}
-        self._attr_map = {}
-        self._recent_scores = {}
-        self._recent_index = 0
+        self._word_index = WordIndex()
+        self._doc_word_counts = self._word_index.word_counts
+        self._attr_map = self._word_index.attr_map
+        self._usage_store = None
+        self._usage = UsageStats()
+        self._pending_word = ""
+        self._streaming = False
         self._show_line_numbers = True
         self._autocomplete_enabled = True
         self._autocomplete_delay = 200
         self._intelicode_enabled = True
         self._max_suggestions = 60
-        self._base_suggestions = []
-        self._lang_keywords = set()
-        self._lang_functions = set()
+        self._vocabulary = None
+        self._doc_index = CompletionIndex(static_score=self._static_score)
+        self._fuzzy = FuzzyMatcher()
+        self._workspace_index = None
 
         font_cfg = self.config_manager.get("editor") or {}
         font_name = font_cfg.get("font_family") or UI_CONFIG["font_code"][0]
@@ -125,28 +416,41 @@ class Editor(QPlainTextEdit):
         self.updateRequest.connect(self.update_line_number_area)
         self.cursorPositionChanged.connect(self._on_cursor_moved)
         self.textChanged.connect(self._on_text_changed)
+        self.document().contentsChange.connect(self._on_document_contents_change)
         self.update_line_number_area_width(0)
 
-        lang_config = self.get_current_language_config()
         theme = THEMES[self.config_manager.get("theme") or "dark"]
-        self.highlighter = CodeHighlighter(self.document(), lang_config, theme)
+        self.highlighter = CodeHighlighter(self.document(), self.get_current_language_id(), theme)
+        self.verticalScrollBar().valueChanged.connect(self._on_viewport_scrolled)
 
         self.completer = QCompleter(self)
         self.completer.setWidget(self)
         self.completer.setCaseSensitivity(Qt.CaseInsensitive)
-        self.completer.setCompletionMode(QCompleter.PopupCompletion)
+        # Candidates are filtered and ranked by _compute_completions, including
+        # fuzzy matches that do not start with the typed prefix.
+        self.completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
         self.completer.activated.connect(self.insert_completion)
         self._completer_model = QStringListModel(self)
         self.completer.setModel(self._completer_model)
         self._completion_timer = QTimer(self)
         self._completion_timer.setSingleShot(True)
         self._completion_timer.timeout.connect(self._update_doc_words)
+        self._completion_generation = 0
+        self._completion_show_popup = False
+        self._completion_worker = CoalescingWorker(self._compute_completions, name="completions")
+        self.completions_ready.connect(self._on_completions_ready)
+        self.vocabulary_rebuilt.connect(self.update_completer_model)
+        self.destroyed.connect(self._completion_worker.close)
         self._apply_indent_settings()
         self.update_completer_model()
 
         self._extra_selections = []
+        self._highlight_stale = False
         self.apply_editor_settings()
         self.aplicar_syntax_highlight()
+
+    def get_current_language_id(self):
+        return self.current_language if self.current_language in LANGUAGES else "python"
 
     def get_current_language_config(self):
         return LANGUAGES.get(self.current_language, LANGUAGES.get("python"))
@@ -158,20 +462,36 @@ class Editor(QPlainTextEdit):
             self.update_completer_model()
             self.aplicar_syntax_highlight()
 
+    def set_workspace_index(self, workspace_index):
+        self._workspace_index = workspace_index
+        self.update_completer_model()
+
+    def set_usage_store(self, usage_store):
+        self._usage_store = usage_store
+        self.update_completer_model()
+
     def update_completer_model(self):
-        lang = self.get_current_language_config() or {}
-        self._snippets = lang.get("snippets", {}) or {}
-        self._lang_keywords = set(lang.get("keywords", []))
-        self._lang_functions = set(lang.get("functions", []))
-        suggestions = set(self._lang_keywords | self._lang_functions)
-        suggestions.update(self._snippets.keys())
-        suggestions.update(self._doc_words)
-        self._base_suggestions = sorted(suggestions)
+        # Language and workspace words live in a vocabulary shared by every
+        # editor of the language; only the document words are indexed here.
+        language_id = self.get_current_language_id()
+        self._vocabulary = get_vocabulary(language_id, self._workspace_index, self._on_vocabulary_rebuilt)
+        self._snippets = self._vocabulary.snippets
+        if self._usage_store is not None:
+            self._usage = self._usage_store.stats(language_id)
+        self._word_index.touched_words.clear()
+        # A new index rather than an in-place rebuild: the completion worker
+        # may still be ranking against the previous one.
+        self._doc_index = CompletionIndex(self._doc_word_counts, static_score=self._static_score)
         prefix = self.completer.completionPrefix() or ""
         if prefix:
-            self._update_completions(prefix)
-        else:
-            self._completer_model.setStringList(self._base_suggestions)
+            self._request_completions(prefix, show_popup=False)
+
+    def _on_vocabulary_rebuilt(self):
+        try:
+            self.vocabulary_rebuilt.emit()
+        except RuntimeError:
+            # The editor was closed while the vocabulary was being built.
+            pass
 
     def _apply_indent_settings(self):
         lang = self.get_current_language_config() or {}
@@ -183,23 +503,43 @@ class Editor(QPlainTextEdit):
         else:
             self.setTabStopDistance(size * self.fontMetrics().horizontalAdvance(" "))
 
+    def _on_document_contents_change(self, position, removed, added):
+        if self._streaming:
+            return
+        doc = self.document()
+        index = self._word_index
+        first_block = doc.findBlock(position)
+        last_block = doc.findBlock(min(position + added, doc.characterCount() - 1))
+        if not first_block.isValid() or not last_block.isValid():
+            index.reset(doc.toPlainText().split("\n"))
+            return
+        first = first_block.blockNumber()
+        last = last_block.blockNumber()
+        new_count = last - first + 1
+        removed_count = len(index.lines) - (doc.blockCount() - new_count)
+        if removed_count < 0:
+            index.reset(doc.toPlainText().split("\n"))
+            return
+        if new_count > 1000:
+            lines = doc.toPlainText().split("\n")[first:last + 1]
+        else:
+            lines = []
+            block = first_block
+            while block.isValid() and len(lines) < new_count:
+                lines.append(block.text())
+                block = block.next()
+        index.replace_lines(first, removed_count, lines)
+
     def _update_doc_words(self):
-        text = self.toPlainText()
-        words = re.findall(r"[A-Za-z_][A-Za-z0-9_]{2,}", text)
-        counts = Counter(words)
-        word_set = set(counts.keys())
-        attr_map = self._extract_attr_map(text)
-        if word_set != self._doc_words or counts != self._doc_word_counts or attr_map != self._attr_map:
-            self._doc_words = word_set
-            self._doc_word_counts = counts
-            self._attr_map = attr_map
+        # The word index is kept current by contentsChange; the completer
+        # model only needs rebuilding when a word appeared or disappeared.
+        index = self._word_index
+        if index.vocabulary_changed:
+            index.vocabulary_changed = False
             self.update_completer_model()
-
-    def _extract_attr_map(self, text):
-        attr_map = {}
-        for base, attr in re.findall(r"\\b([A-Za-z_][A-Za-z0-9_]*)\\.([A-Za-z_][A-Za-z0-9_]*)", text):
-            attr_map.setdefault(base, set()).add(attr)
-        return attr_map
+        elif index.touched_words:
+            self._doc_index.refresh_scores(index.touched_words)
+            index.touched_words.clear()
 
     def line_number_area_width(self):
         digits = len(str(max(1, self.blockCount())))
@@ -269,17 +609,92 @@ class Editor(QPlainTextEdit):
             "padding: 6px;"
             "}"
         )
-        self.aplicar_syntax_highlight()
+        # Token boundaries do not depend on the theme: only re-apply the
+        # cached spans with the new palette, and only once the tab is shown.
+        if self.highlighter.set_theme(theme):
+            if self.isVisible():
+                self._rehighlight()
+            else:
+                self._highlight_stale = True
         self.line_number_area.update()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self._highlight_stale:
+            self._highlight_stale = False
+            self._rehighlight()
 
     def aplicar_syntax_highlight(self):
         theme_name = self.config_manager.get("theme") or "dark"
         theme = THEMES.get(theme_name, THEMES["dark"])
-        self.highlighter.set_config(self.get_current_language_config(), theme)
-        self.highlighter.rehighlight()
+        self.highlighter.set_config(self.get_current_language_id(), theme)
+        self._highlight_stale = False
+        self._rehighlight()
         self._refresh_extra_selections()
 
+    def _rehighlight(self, lines=None):
+        if self.blockCount() < LAZY_HIGHLIGHT_MIN_BLOCKS:
+            self.highlighter.rehighlight()
+            return
+        first, last = self._visible_block_range()
+        self.highlighter.schedule_rehighlight(first, last, lines)
+
+    def _visible_block_range(self):
+        first = self.firstVisibleBlock().blockNumber()
+        line_height = max(1, self.fontMetrics().height())
+        visible = self.viewport().height() // line_height + 1
+        return max(0, first - LAZY_HIGHLIGHT_MARGIN), first + visible + LAZY_HIGHLIGHT_MARGIN
+
+    def _on_viewport_scrolled(self, _value):
+        if self.highlighter.is_lazy():
+            first, last = self._visible_block_range()
+            self.highlighter.prioritize(first, last)
+
+    def setPlainText(self, text):
+        # Loading a large buffer would otherwise highlight every block
+        # synchronously from the contentsChange signal.
+        large = text.count("\n") >= LAZY_HIGHLIGHT_MIN_BLOCKS
+        if large:
+            self.highlighter.defer_all()
+        super().setPlainText(text)
+        if large:
+            self._rehighlight()
+
+    def begin_streamed_load(self):
+        """Prepare for text arriving through append_streamed_text().
+
+        The editor is read-only and unhighlighted until end_streamed_load().
+        """
+        self._streaming = True
+        self.setReadOnly(True)
+        self.document().setUndoRedoEnabled(False)
+        self.highlighter.defer_all()
+
+    def append_streamed_text(self, text):
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text)
+
+    def end_streamed_load(self, word_index=None):
+        """Finish a streamed load; word_index, if given, already covers the text."""
+        self._streaming = False
+        if word_index is None:
+            word_index = WordIndex()
+            word_index.reset(self.toPlainText().split("\n"))
+        word_index.vocabulary_changed = True
+        self._word_index = word_index
+        self._doc_word_counts = word_index.word_counts
+        self._attr_map = word_index.attr_map
+        self.document().setUndoRedoEnabled(True)
+        self.setReadOnly(False)
+        self.moveCursor(QTextCursor.Start)
+        # A copy: the word index keeps updating its lines as the user edits.
+        self._rehighlight(list(word_index.lines))
+        self._update_doc_words()
+
     def _on_text_changed(self):
+        if self._streaming:
+            return
         self._refresh_extra_selections()
         if self._autocomplete_enabled:
             if self._intelicode_enabled:
@@ -313,59 +728,20 @@ class Editor(QPlainTextEdit):
         self.setExtraSelections(selections)
 
     def _match_bracket_indices(self):
-        text = self.toPlainText()
-        if not text:
-            return []
-
-        pos = self.textCursor().position()
-        candidate_positions = []
-        if pos > 0:
-            candidate_positions.append(pos - 1)
-        if pos < len(text):
-            candidate_positions.append(pos)
-
-        for idx in candidate_positions:
-            ch = text[idx]
-            if ch in "()[]{}":
-                match = self._find_matching_bracket(text, idx)
-                if match is not None:
-                    return [idx, match]
+        cursor = self.textCursor()
+        block = cursor.block()
+        column = cursor.positionInBlock()
+        text = block.text()
+        number = block.blockNumber()
+        record = self.highlighter.bracket_record_at(number)
+        for col in (column - 1, column):
+            if 0 <= col < len(text) and text[col] in BRACKET_PAIRS and col in record[0]:
+                partner = self.highlighter.find_bracket_partner(number, col, text[col])
+                if partner is not None:
+                    partner_block = self.document().findBlockByNumber(partner[0])
+                    return [block.position() + col, partner_block.position() + partner[1]]
         return []
 
-    def _find_matching_bracket(self, text, index):
-        pairs = {"(": ")", "[": "]", "{": "}", ")": "(", "]": "[", "}": "{"}
-        openers = "([{"
-        ch = text[index]
-        target = pairs[ch]
-
-        if ch in openers:
-            step = 1
-            stack = 1
-            i = index + 1
-            while i < len(text):
-                curr = text[i]
-                if curr == ch:
-                    stack += 1
-                elif curr == target:
-                    stack -= 1
-                    if stack == 0:
-                        return i
-                i += step
-        else:
-            step = -1
-            stack = 1
-            i = index - 1
-            while i >= 0:
-                curr = text[i]
-                if curr == ch:
-                    stack += 1
-                elif curr == target:
-                    stack -= 1
-                    if stack == 0:
-                        return i
-                i += step
-        return None
-
     def insert_completion(self, completion):
         cursor = self.textCursor()
         prefix = self.completer.completionPrefix()
@@ -399,7 +775,7 @@ class Editor(QPlainTextEdit):
         block_text = cursor.block().text()
         pos = cursor.positionInBlock()
         left = block_text[:pos]
-        match = re.search(r"([A-Za-z_][A-Za-z0-9_]*)\\.([A-Za-z_][A-Za-z0-9_]*)?$", left)
+        match = re.search(r"([A-Za-z_][A-Za-z0-9_]*)\.([A-Za-z_][A-Za-z0-9_]*)?$", left)
         if match:
             base = match.group(1)
             partial = match.group(2) or ""
@@ -407,64 +783,175 @@ class Editor(QPlainTextEdit):
         return self.text_under_cursor(), None
 
     def _capture_recent_word(self):
+        # A word is recorded once the cursor leaves it, not for every prefix
+        # typed on the way.
         cursor = self.textCursor()
-        cursor.select(QTextCursor.WordUnderCursor)
-        word = cursor.selectedText()
-        if not word or len(word) < 3:
-            return
-        if not re.match(r"^[A-Za-z_][A-Za-z0-9_]*$", word):
+        left = cursor.block().text()[: cursor.positionInBlock()]
+        match = re.search(r"[A-Za-z_][A-Za-z0-9_]*$", left)
+        word = match.group(0) if match else ""
+        pending = self._pending_word
+        if pending and not (word and (word.startswith(pending) or pending.startswith(word))):
+            if len(pending) >= 3:
+                self._usage.record(pending)
+        self._pending_word = word
+
+    def _request_completions(self, prefix, base=None, show_popup=True):
+        # The worker ranks against sources only. The vocabulary and document
+        # index are replaced rather than modified and the index's scores are
+        # copied on write, so keeping references is enough; the usage stats
+        # and the attributes of base are copied.
+        self._completion_generation += 1
+        if show_popup:
+            self._completion_show_popup = True
+        attrs = frozenset(self._attr_map.get(base, ())) if base else frozenset()
+        attr_candidates = sorted(attrs) if attrs else None
+        doc_index = self._doc_index
+        sources = (self._vocabulary, doc_index, doc_index.static, self._usage.copy(), attrs)
+        self._completion_worker.submit(self._completion_generation, prefix, base, sources, attr_candidates)
+
+    def _cancel_completions(self):
+        self._completion_generation += 1
+        self._completion_show_popup = False
+        self.completer.popup().hide()
+
+    def _compute_completions(self, generation, prefix, base, sources, attr_candidates):
+        if generation != self._completion_generation:
             return
-        self._recent_index += 1
-        self._recent_scores[word] = self._recent_index
-        if len(self._recent_scores) > 2000:
-            cutoff = self._recent_index - 1500
-            self._recent_scores = {w: i for w, i in self._recent_scores.items() if i >= cutoff}
-
-    def _update_completions(self, prefix, base=None):
-        if base and base in self._attr_map:
-            candidates = sorted(self._attr_map.get(base, []))
-            if not candidates:
-                candidates = self._base_suggestions
+        if attr_candidates is not None:
+            matches = self._rank_candidates(attr_candidates, prefix, base, sources)
         else:
-            candidates = self._base_suggestions
+            matches = self._indexed_completions(prefix, base, sources, generation)
+        if matches is None or generation != self._completion_generation:
+            return
+        try:
+            self.completions_ready.emit(generation, matches)
+        except RuntimeError:
+            # The editor was deleted while ranking.
+            pass
+
+    def _on_completions_ready(self, generation, matches):
+        if generation != self._completion_generation:
+            return
+        self._completer_model.setStringList(matches)
+        popup = self.completer.popup()
+        show_popup = self._completion_show_popup
+        self._completion_show_popup = False
+        if not show_popup and not popup.isVisible():
+            return
+        if not matches:
+            popup.hide()
+            return
+        popup.setCurrentIndex(self.completer.completionModel().index(0, 0))
+        rect = self.cursorRect()
+        rect.setWidth(popup.sizeHintForColumn(0) + popup.verticalScrollBar().sizeHint().width())
+        self.completer.complete(rect)
+
+    def _indexed_completions(self, prefix, base, sources, generation):
+        vocabulary, doc_index = sources[:2]
+        limit = self._max_suggestions
+        if not self._intelicode_enabled:
+            words = set(vocabulary.index.prefix_matches(prefix, limit))
+            words.update(doc_index.prefix_matches(prefix, limit))
+            matches = sorted(words, key=lambda w: (w.lower(), w))
+            return matches[:limit] if limit else matches
+
+        def score(word):
+            return self._score_completion(word, prefix, base, sources)
+
+        # Document words carry their full static score in doc_index and every
+        # other word scores as in the shared index, so the overall best are
+        # among the best of each side.
+        boosted = self._recent_boosted_words(prefix, sources[3]) + [prefix]
+        picked = set(vocabulary.index.top_k(prefix, limit, score, boosted))
+        picked.update(doc_index.top_k(prefix, limit, score, boosted))
+        matches = sorted(picked, key=lambda w: (-score(w), w.lower()))
+        if limit:
+            matches = matches[:limit]
+        # The word being typed is in the document index too, so it does not
+        # count as a match on its own.
+        if prefix and not [word for word in matches if word != prefix]:
+            return self._fuzzy_completions(prefix, base, sources, generation)
+        return matches
 
+    def _fuzzy_completions(self, prefix, base, sources, generation):
+        vocabulary, doc_index = sources[:2]
+        first = True
+        while True:
+            if generation != self._completion_generation:
+                return None
+            deadline = time.perf_counter() + FUZZY_SLICE_MS / 1000.0
+            scores, vocabulary_done = vocabulary.fuzzy_match(prefix, deadline)
+            scores = dict(scores)
+            doc_scores, doc_done = self._fuzzy.match(prefix, doc_index.words, deadline)
+            scores.update(doc_scores)
+            scores.pop(prefix, None)
+            matches = self._rank_fuzzy(scores, prefix, base, sources)
+            if vocabulary_done and doc_done:
+                return matches
+            if first and matches and generation == self._completion_generation:
+                # Partial results first; the complete list replaces them.
+                try:
+                    self.completions_ready.emit(generation, matches)
+                except RuntimeError:
+                    return None
+            first = False
+
+    def _recent_boosted_words(self, prefix, usage):
+        # Only words the prefix completes to can be picked, and only those
+        # with a usage bonus can rank above their static score.
+        key = prefix.lower()
+        return [word for word in usage.words() if word.lower().startswith(key) and self._usage_bonus(word, usage)]
+
+    def _rank_candidates(self, candidates, prefix, base, sources):
         if prefix:
             matches = [c for c in candidates if c.lower().startswith(prefix.lower())]
             if not matches and self._intelicode_enabled:
-                matches = [c for c in candidates if prefix.lower() in c.lower()]
+                return self._rank_fuzzy(fuzzy_scores(prefix, candidates), prefix, base, sources)
         else:
-            matches = candidates
+            matches = list(candidates)
 
         if self._intelicode_enabled:
-            matches.sort(key=lambda w: (-self._score_completion(w, prefix, base), w.lower()))
+            matches.sort(key=lambda w: (-self._score_completion(w, prefix, base, sources), w.lower()))
         else:
             matches.sort(key=lambda w: w.lower())
 
         if self._max_suggestions and len(matches) > self._max_suggestions:
             matches = matches[: self._max_suggestions]
-        self._completer_model.setStringList(matches)
+        return matches
 
-    def _score_completion(self, word, prefix, base=None):
-        score = 0.0
-        if word in self._snippets:
-            score += 6.0
-        if word in self._lang_keywords:
-            score += 2.0
-        if word in self._lang_functions:
-            score += 3.0
+    def _rank_fuzzy(self, scores, prefix, base, sources):
+        matches = sorted(scores, key=lambda w: (-self._score_completion(w, prefix, base, sources, scores[w]), w.lower()))
+        if self._max_suggestions and len(matches) > self._max_suggestions:
+            matches = matches[: self._max_suggestions]
+        return matches
+
+    def _static_score(self, word):
+        # GUI thread only: scores the document index as it is built.
         freq = self._doc_word_counts.get(word, 0)
-        score += min(freq, 6)
-        recent = self._recent_scores.get(word)
-        if recent:
-            distance = max(0, self._recent_index - recent)
-            score += max(0, 6 - (distance // 15))
+        return self._vocabulary.static_score(word) + min(freq, 6)
+
+    @staticmethod
+    def _usage_bonus(word, usage):
+        recent = usage.recency(word)
+        if not recent:
+            return 0.0
+        distance = max(0, usage.counter - recent)
+        return max(0, 6 - (distance // 15)) + min(usage.frequency(word), 6.0) * 0.5
+
+    def _score_completion(self, word, prefix, base, sources, match_score=0.0):
+        vocabulary, doc_index, doc_static, usage, attrs = sources
+        # Document words carry _static_score in doc_index; any other word has
+        # no occurrences, so its vocabulary score is the whole static score.
+        static = doc_index.static_score_of(word, doc_static)
+        if static is None:
+            static = vocabulary.static_score(word)
+        score = static + match_score + self._usage_bonus(word, usage)
         if prefix and word.lower().startswith(prefix.lower()):
             score += 2.0
             if word == prefix:
                 score += 1.0
-        if base and base in self._attr_map and word in self._attr_map.get(base, set()):
+        if word in attrs:
             score += 1.5
-        score -= len(word) * 0.01
         return score
 
     def keyPressEvent(self, event: QKeyEvent):
@@ -506,20 +993,12 @@ class Editor(QPlainTextEdit):
 
         prefix, base = self._completion_context()
         if len(prefix) < 1 and not (self._intelicode_enabled and base):
-            self.completer.popup().hide()
+            self._cancel_completions()
             return
 
         if prefix != self.completer.completionPrefix():
             self.completer.setCompletionPrefix(prefix)
-        self._update_completions(prefix, base)
-        self.completer.popup().setCurrentIndex(self.completer.completionModel().index(0, 0))
-
-        rect = self.cursorRect()
-        rect.setWidth(
-            self.completer.popup().sizeHintForColumn(0)
-            + self.completer.popup().verticalScrollBar().sizeHint().width()
-        )
-        self.completer.complete(rect)
+        self._request_completions(prefix, base)
 
     def cursor_position(self):
         cursor = self.textCursor()
@@ -549,7 +1028,7 @@ class Editor(QPlainTextEdit):
         self._autocomplete_enabled = bool(auto_cfg.get("enabled", True))
         self._autocomplete_delay = int(auto_cfg.get("delay") or 200)
         if not self._autocomplete_enabled:
-            self.completer.popup().hide()
+            self._cancel_completions()
 
         intelicode_cfg = self.config_manager.get("intelicode") or {}
         self._intelicode_enabled = bool(intelicode_cfg.get("enabled", True))
@@ -1,6 +1,6 @@
 import os
 
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, Signal
 from PySide6.QtGui import QPixmap
 from PySide6.QtWidgets import QDialog, QLabel, QMessageBox, QTreeWidget, QTreeWidgetItem, QVBoxLayout
 
@@ -11,6 +11,8 @@ IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".bmp", ".webp"}
 
 
 class Explorer(QTreeWidget):
+    root_path_changed = Signal(str)
+
     def __init__(self, config_manager, open_file_callback=None, parent=None):
         super().__init__(parent)
         self.config_manager = config_manager
@@ -25,6 +27,7 @@ class Explorer(QTreeWidget):
     def set_root_path(self, path):
         self.root_path = path
         self.refresh()
+        self.root_path_changed.emit(path or "")
 
     def refresh(self):
         self.clear()
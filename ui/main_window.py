@@ -2,7 +2,7 @@ import json
 import os
 import sys
 
-from PySide6.QtCore import QEvent, QRegularExpression, Signal, Qt
+from PySide6.QtCore import QEvent, QRegularExpression, QTimer, Signal, Qt
 from PySide6.QtGui import QAction, QTextCursor, QTextDocument
 from PySide6.QtWidgets import (
     QCheckBox,
@@ -18,9 +18,11 @@ from PySide6.QtWidgets import (
     QMainWindow,
     QMenu,
     QMessageBox,
+    QProgressBar,
     QPushButton,
     QScrollArea,
     QSplitter,
+    QTabBar,
     QTabWidget,
     QTextEdit,
     QVBoxLayout,
@@ -32,14 +34,35 @@ from core.languages import LANGUAGES, detectar_linguagem_por_extensao
 from core.themes import THEMES
 from ui.editor import Editor
 from ui.explorer import Explorer
+from ui.output_view import OutputView
 from utils.openai_client import OpenAIRequestError, create_response, extract_output_text
 from utils.auto_importer import auto_import_python
+from utils.file_loader import ASYNC_LOAD_MIN_SIZE, FileLoader, read_text
+from utils.file_saver import FileSaver
+from utils.output_buffer import FLUSH_INTERVAL_MS, OutputBuffer
+from utils.output_log import output_log_path
 from utils.venv_manager import VenvManager
 from utils.process_mgr import ProcessManager
+from utils.pty_terminal import DEFAULT_COLUMNS, DEFAULT_ROWS
+from utils.run_scheduler import QUEUED, RUNNING, STOPPED
+from utils.usage_stats import UsageStore
+from utils.workspace_index import WorkspaceIndex
 
 
 class MainWindow(QMainWindow):
-    output_received = Signal(str)
+    # Emitted from any thread when output_buffer stops being empty.
+    output_ready = Signal()
+    workspace_index_updated = Signal()
+    # (loader, chunk, progress) and (loader, result, error) from FileLoader threads.
+    file_chunk_loaded = Signal(object, str, float)
+    file_load_finished = Signal(object, object, object)
+    # (path, elapsed seconds, error, callbacks) from the FileSaver thread.
+    file_saved = Signal(str, float, object, object)
+    # Run whose state changed, from the RunScheduler threads.
+    run_state_changed = Signal(object)
+
+    # Finished runs whose output tabs are kept open.
+    MAX_FINISHED_RUN_TABS = 8
 
     def __init__(self, config_manager):
         super().__init__()
@@ -48,10 +71,24 @@ class MainWindow(QMainWindow):
         self.tab_meta = {}
         self.untitled_count = 1
         self.closed_tabs = []
+        self._file_loaders = {}
+        self._run_views = {}
+        # Commands saved with the workspace; each terminal starts from them.
         self._terminal_history = []
-        self._terminal_history_index = -1
-        self.process_manager = ProcessManager(self.write_to_output)
+        # Terminal pane -> {"session": id or None, "history", "history_index", "size", "used"}.
+        self._terminals = {}
+        self._terminal_views = {}
+        self._terminal_count = 0
+        self.output_buffer = OutputBuffer(self.output_ready.emit)
+        self.process_manager = ProcessManager(
+            self.write_to_output,
+            self.run_state_changed.emit,
+            (self.config_manager.get("run") or {}).get("max_concurrent") or 2,
+        )
         self.venv_manager = VenvManager(self.write_to_output, self.config_manager)
+        self.workspace_index = WorkspaceIndex(self.workspace_index_updated.emit, self.write_to_output)
+        self.usage_store = UsageStore(self.write_to_output)
+        self.file_saver = FileSaver(self.file_saved.emit)
 
         self.app_root = self._detect_app_root()
         self.extension_manager = ExtensionManager(self.config_manager, self.app_root)
@@ -64,9 +101,19 @@ class MainWindow(QMainWindow):
             self.config_manager.get("window", "height") or 900,
         )
 
-        self.output_received.connect(self._safe_write_to_output)
+        self._output_timer = QTimer(self)
+        self._output_timer.setSingleShot(True)
+        self._output_timer.setInterval(FLUSH_INTERVAL_MS)
+        self._output_timer.timeout.connect(self._flush_output)
+        self.output_ready.connect(self._output_timer.start)
+        self.workspace_index_updated.connect(self._refresh_workspace_completions)
+        self.file_chunk_loaded.connect(self._on_file_chunk_loaded)
+        self.file_load_finished.connect(self._on_file_load_finished)
+        self.file_saved.connect(self._on_file_saved)
+        self.run_state_changed.connect(self._on_run_state_changed)
 
         self.setup_ui()
+        self.explorer.root_path_changed.connect(self._on_root_path_changed)
         self.setup_menus()
         self._restore_session()
         self.extension_manager.attach_window(self)
@@ -124,6 +171,16 @@ class MainWindow(QMainWindow):
         splitter.setStretchFactor(1, 1)
         splitter.setSizes([280, 1120])
 
+        self.load_progress = QProgressBar()
+        self.load_progress.setRange(0, 100)
+        self.load_progress.setFixedWidth(160)
+        self.load_cancel_button = QPushButton("Cancel")
+        self.load_cancel_button.clicked.connect(self._cancel_current_file_load)
+        self.statusBar().addPermanentWidget(self.load_progress)
+        self.statusBar().addPermanentWidget(self.load_cancel_button)
+        self.load_progress.hide()
+        self.load_cancel_button.hide()
+
         self.statusBar().showMessage("Ready")
 
     def _detect_app_root(self):
@@ -147,9 +204,29 @@ class MainWindow(QMainWindow):
     def _setup_output_tab(self):
         layout = QVBoxLayout(self.tab_output)
         layout.setContentsMargins(0, 0, 0, 0)
-        self.output_box = QTextEdit()
-        self.output_box.setReadOnly(True)
-        layout.addWidget(self.output_box)
+
+        actions = QHBoxLayout()
+        self.btn_stop_run = QPushButton("Stop")
+        self.btn_stop_run.clicked.connect(lambda: self.stop_run())
+        actions.addWidget(self.btn_stop_run)
+        self.btn_kill_run = QPushButton("Kill")
+        self.btn_kill_run.clicked.connect(lambda: self.stop_run(kill=True))
+        actions.addWidget(self.btn_kill_run)
+        actions.addStretch(1)
+        layout.addLayout(actions)
+
+        # One tab per run, next to the shared output of the IDE.
+        self.output_tabs = QTabWidget()
+        self.output_tabs.setTabsClosable(True)
+        self.output_tabs.tabCloseRequested.connect(self._close_run_tab)
+        self.output_tabs.currentChanged.connect(lambda _: self._update_run_actions())
+        layout.addWidget(self.output_tabs)
+
+        self.output_box = OutputView("output")
+        self.output_box.open_log_requested.connect(self.abrir_arquivo_por_caminho)
+        self.output_tabs.addTab(self.output_box, "Output")
+        self.output_tabs.tabBar().setTabButton(0, QTabBar.RightSide, None)
+        self._update_run_actions()
 
     def _setup_terminal_tab(self):
         layout = QVBoxLayout(self.tab_terminal)
@@ -166,11 +243,83 @@ class MainWindow(QMainWindow):
         self.btn_send.clicked.connect(self.send_terminal_command)
         input_row.addWidget(self.btn_send)
 
+        self.btn_new_terminal = QPushButton("New Terminal")
+        self.btn_new_terminal.clicked.connect(lambda: self.new_terminal(start=True))
+        input_row.addWidget(self.btn_new_terminal)
+
         layout.addLayout(input_row)
 
-        self.term_output = QTextEdit()
-        self.term_output.setReadOnly(True)
-        layout.addWidget(self.term_output)
+        self.terminal_tabs = QTabWidget()
+        self.terminal_tabs.setTabsClosable(True)
+        self.terminal_tabs.tabCloseRequested.connect(self._close_terminal_tab)
+        layout.addWidget(self.terminal_tabs)
+        self.new_terminal()
+
+    @property
+    def term_output(self):
+        """Terminal pane shown in the Terminal tab."""
+        return self.terminal_tabs.currentWidget()
+
+    def new_terminal(self, start=False):
+        self._terminal_count += 1
+        view = OutputView(f"terminal-{self._terminal_count}")
+        view.open_log_requested.connect(self.abrir_arquivo_por_caminho)
+        view.size_changed.connect(lambda columns, rows, view=view: self._on_terminal_resized(view, columns, rows))
+        self._terminals[view] = {
+            "session": None,
+            "history": list(self._terminal_history),
+            "history_index": len(self._terminal_history),
+            "size": (DEFAULT_COLUMNS, DEFAULT_ROWS),
+            "used": False,
+        }
+        self._apply_output_settings()
+        self.terminal_tabs.addTab(view, f"Terminal {self._terminal_count}")
+        self.terminal_tabs.setCurrentWidget(view)
+        if start:
+            self._start_terminal_session(view)
+            self.main_tabs.setCurrentWidget(self.tab_terminal)
+            self.term_entry.setFocus()
+        return view
+
+    def _start_terminal_session(self, view):
+        terminal = self._terminals[view]
+        editor = self.get_current_editor()
+        lang = editor.current_language if editor else "python"
+        columns, rows = terminal["size"]
+        session_id = self.process_manager.start_terminal(lang, self.config_manager, columns, rows)
+        terminal["session"] = session_id
+        if session_id is not None:
+            self._terminal_views[session_id] = view
+        return session_id
+
+    def _on_terminal_resized(self, view, columns, rows):
+        terminal = self._terminals.get(view)
+        if terminal is None:
+            return
+        terminal["size"] = (columns, rows)
+        if terminal["session"] is not None:
+            self.process_manager.resize_terminal(terminal["session"], columns, rows)
+
+    def _close_terminal_tab(self, index):
+        view = self.terminal_tabs.widget(index)
+        terminal = self._terminals.pop(view, None)
+        if terminal is None:
+            return
+        if terminal["session"] is not None:
+            self.process_manager.stop_terminal(terminal["session"])
+            self._terminal_views.pop(terminal["session"], None)
+        self.terminal_tabs.removeTab(index)
+        view.close_log()
+        view.deleteLater()
+        if not self._terminals:
+            self.new_terminal()
+
+    def _set_terminal_history(self, history):
+        self._terminal_history = history
+        for terminal in self._terminals.values():
+            if not terminal["used"]:
+                terminal["history"] = list(history)
+                terminal["history_index"] = len(history)
 
     def _setup_settings_tab(self):
         layout = QVBoxLayout(self.tab_settings)
@@ -229,6 +378,34 @@ class MainWindow(QMainWindow):
         self.settings_auto_imports = QCheckBox("Python auto-import on save")
         self.settings_auto_imports.setChecked(bool(python_cfg.get("auto_imports", True)))
         form.addRow(self.settings_auto_imports)
+        self.settings_fork_server = QCheckBox("Keep a warm Python interpreter for Run")
+        self.settings_fork_server.setChecked(bool(python_cfg.get("fork_server", False)))
+        form.addRow(self.settings_fork_server)
+        self.settings_preload_modules = QLineEdit(python_cfg.get("preload_modules") or "")
+        self.settings_preload_modules.setPlaceholderText("numpy, pandas")
+        form.addRow("Preload modules:", self.settings_preload_modules)
+
+        run_cfg = self.config_manager.get("run") or {}
+        self.settings_max_runs = QComboBox()
+        for count in (1, 2, 3, 4, 6, 8):
+            self.settings_max_runs.addItem(str(count))
+        self.settings_max_runs.setCurrentText(str(run_cfg.get("max_concurrent") or 2))
+        form.addRow("Concurrent runs:", self.settings_max_runs)
+
+        output_cfg = self.config_manager.get("output") or {}
+        self.settings_output_lines = QComboBox()
+        for count in (1000, 5000, 10000, 50000, 100000):
+            self.settings_output_lines.addItem(str(count))
+        self.settings_output_lines.setCurrentText(str(output_cfg.get("max_lines") or 10000))
+        form.addRow("Output scrollback (lines):", self.settings_output_lines)
+
+        self.settings_output_log = QCheckBox("Keep full output in a log file")
+        self.settings_output_log.setChecked(bool(output_cfg.get("log_to_file", False)))
+        form.addRow(self.settings_output_log)
+
+        self.settings_output_timestamps = QCheckBox("Timestamp Run output lines")
+        self.settings_output_timestamps.setChecked(bool(output_cfg.get("timestamps", False)))
+        form.addRow(self.settings_output_timestamps)
 
         venv_cfg = self.config_manager.get("venv") or {}
         self.settings_auto_venv = QCheckBox("Auto create .venv")
@@ -303,6 +480,16 @@ class MainWindow(QMainWindow):
         intelicode_enabled = self.settings_intelicode.isChecked()
         intelicode_max = int(self.settings_intelicode_max.currentText() or 60)
         auto_imports = self.settings_auto_imports.isChecked()
+        fork_server = self.settings_fork_server.isChecked()
+        preload_modules = self.settings_preload_modules.text().strip()
+        python_pool_changed = (fork_server, preload_modules) != (
+            bool(self.config_manager.get("python", "fork_server")),
+            self.config_manager.get("python", "preload_modules") or "",
+        )
+        max_runs = int(self.settings_max_runs.currentText() or 2)
+        output_lines = int(self.settings_output_lines.currentText() or 10000)
+        output_log = self.settings_output_log.isChecked()
+        output_timestamps = self.settings_output_timestamps.isChecked()
         auto_venv = self.settings_auto_venv.isChecked()
         auto_pip = self.settings_auto_pip.isChecked()
 
@@ -316,11 +503,21 @@ class MainWindow(QMainWindow):
         self.config_manager.set(intelicode_enabled, "intelicode", "enabled")
         self.config_manager.set(intelicode_max, "intelicode", "max_suggestions")
         self.config_manager.set(auto_imports, "python", "auto_imports")
+        self.config_manager.set(fork_server, "python", "fork_server")
+        self.config_manager.set(preload_modules, "python", "preload_modules")
+        self.config_manager.set(max_runs, "run", "max_concurrent")
+        self.config_manager.set(output_lines, "output", "max_lines")
+        self.config_manager.set(output_log, "output", "log_to_file")
+        self.config_manager.set(output_timestamps, "output", "timestamps")
         self.config_manager.set(auto_venv, "venv", "auto_create")
         self.config_manager.set(auto_pip, "venv", "auto_install")
 
         self.aplicar_tema()
         self._apply_editor_settings_to_tabs()
+        self._apply_output_settings()
+        self.process_manager.scheduler.set_max_concurrent(max_runs)
+        if python_pool_changed:
+            self._restart_python_pool()
         self.statusBar().showMessage("Settings applied.", 2500)
         if self.explorer.root_path and (auto_venv or auto_pip):
             self._on_workspace_opened(self.explorer.root_path)
@@ -334,7 +531,9 @@ class MainWindow(QMainWindow):
         }
         default_auto = {"enabled": True, "delay": 200}
         default_intelicode = {"enabled": True, "max_suggestions": 60}
-        default_python = {"auto_imports": True}
+        default_python = {"auto_imports": True, "fork_server": False, "preload_modules": ""}
+        default_run = {"max_concurrent": 2}
+        default_output = {"max_lines": 10000, "log_to_file": False, "timestamps": False}
         default_venv = {"auto_create": True, "auto_install": True}
 
         self.settings_theme.setCurrentText("dark")
@@ -347,6 +546,12 @@ class MainWindow(QMainWindow):
         self.settings_intelicode.setChecked(default_intelicode["enabled"])
         self.settings_intelicode_max.setCurrentText(str(default_intelicode["max_suggestions"]))
         self.settings_auto_imports.setChecked(default_python["auto_imports"])
+        self.settings_fork_server.setChecked(default_python["fork_server"])
+        self.settings_preload_modules.setText(default_python["preload_modules"])
+        self.settings_max_runs.setCurrentText(str(default_run["max_concurrent"]))
+        self.settings_output_lines.setCurrentText(str(default_output["max_lines"]))
+        self.settings_output_log.setChecked(default_output["log_to_file"])
+        self.settings_output_timestamps.setChecked(default_output["timestamps"])
         self.settings_auto_venv.setChecked(default_venv["auto_create"])
         self.settings_auto_pip.setChecked(default_venv["auto_install"])
 
@@ -360,7 +565,7 @@ class MainWindow(QMainWindow):
         self.menus["File"] = file_menu
         file_menu.addAction(self._make_action("New File", "Ctrl+N", self.novo_arquivo))
         file_menu.addAction(self._make_action("Open File", "Ctrl+O", self.abrir_arquivo))
-        file_menu.addAction(self._make_action("Save", "Ctrl+S", self.salvar_arquivo))
+        file_menu.addAction(self._make_action("Save", "Ctrl+S", lambda: self.salvar_arquivo()))
         file_menu.addAction(self._make_action("Close Tab", "Ctrl+W", self.fechar_aba_atual))
         file_menu.addSeparator()
         file_menu.addAction(self._make_action("Open Folder", None, self.abrir_pasta))
@@ -376,6 +581,12 @@ class MainWindow(QMainWindow):
         edit_menu.addAction(self._make_action("Go to Line", "Ctrl+G", self.show_goto_line_dialog))
         edit_menu.addAction(self._make_action("Reopen Closed Tab", "Ctrl+Shift+T", self.reopen_closed_tab))
 
+        run_menu = menubar.addMenu("Run")
+        self.menus["Run"] = run_menu
+        run_menu.addAction(self._make_action("Run File", "F5", self.run_code))
+        run_menu.addAction(self._make_action("Stop Run", "Shift+F5", lambda: self.stop_run()))
+        run_menu.addAction(self._make_action("Kill Run", "Ctrl+Shift+F5", lambda: self.stop_run(kill=True)))
+
         self.theme_menu = menubar.addMenu("Theme")
         self.menus["Theme"] = self.theme_menu
         self._rebuild_theme_menu()
@@ -395,17 +606,9 @@ class MainWindow(QMainWindow):
             self._apply_workspace_data(data)
             return
 
-        open_files = workspace.get("open_files") or []
-        for path in open_files:
-            if path and os.path.isfile(path):
-                self.abrir_arquivo_por_caminho(path)
-
-        active_file = workspace.get("active_file")
-        if active_file and active_file in self.open_file_tabs:
-            self.editor_tabs.setCurrentWidget(self.open_file_tabs[active_file])
+        self._restore_tabs(workspace.get("open_files") or [], workspace.get("active_file"))
 
-        self._terminal_history = workspace.get("terminal_history") or []
-        self._terminal_history_index = len(self._terminal_history)
+        self._set_terminal_history(workspace.get("terminal_history") or [])
 
     def _save_session(self):
         open_files = [meta.get("path") for meta in self.tab_meta.values() if meta.get("path")]
@@ -448,6 +651,33 @@ class MainWindow(QMainWindow):
         except Exception:
             pass
 
+    def _on_root_path_changed(self, root_path):
+        # Runs resolve the workspace venv from here before the session is saved.
+        self.config_manager.set(root_path, "workspace", "root_path")
+        self.workspace_index.set_root(root_path)
+        self.usage_store.set_root(root_path)
+        self._refresh_workspace_completions()
+        self._apply_output_settings()
+        self._restart_python_pool()
+
+    def _restart_python_pool(self):
+        # Servers of the previous workspace or settings are not reused.
+        self.process_manager.python_pool.close()
+        self.process_manager.prewarm_python(self.config_manager)
+
+    def _apply_output_settings(self):
+        output_cfg = self.config_manager.get("output") or {}
+        max_lines = output_cfg.get("max_lines") or 10000
+        log_to_file = bool(output_cfg.get("log_to_file", False))
+        root_path = self.explorer.root_path
+        for view in [self.output_box, *self._terminals, *self._run_views.values()]:
+            view.set_scrollback(max_lines, output_log_path(root_path, view.log_name) if log_to_file else None)
+
+    def _refresh_workspace_completions(self):
+        for meta in self.tab_meta.values():
+            if meta["editor"]:
+                meta["editor"].update_completer_model()
+
     def _on_workspace_opened(self, root_path):
         venv_cfg = self.config_manager.get("venv") or {}
         if not venv_cfg.get("auto_create", True) and not venv_cfg.get("auto_install", True):
@@ -455,17 +685,9 @@ class MainWindow(QMainWindow):
         self.venv_manager.ensure_workspace_venv(root_path)
 
     def _apply_workspace_data(self, data):
-        open_files = data.get("open_files") or []
-        for path in open_files:
-            if path and os.path.isfile(path):
-                self.abrir_arquivo_por_caminho(path)
-
-        active_file = data.get("active_file")
-        if active_file and active_file in self.open_file_tabs:
-            self.editor_tabs.setCurrentWidget(self.open_file_tabs[active_file])
+        self._restore_tabs(data.get("open_files") or [], data.get("active_file"))
 
-        self._terminal_history = data.get("terminal_history") or []
-        self._terminal_history_index = len(self._terminal_history)
+        self._set_terminal_history(data.get("terminal_history") or [])
 
     def _rebuild_recent_menu(self):
         if not hasattr(self, "recent_menu") or self.recent_menu is None:
@@ -545,8 +767,10 @@ class MainWindow(QMainWindow):
         self.theme_menu.addAction(self._make_action("Theme Editor", None, self.show_theme_editor))
 
     def _on_editor_tab_changed(self):
+        self._load_pending_tab(self.editor_tabs.currentWidget())
         self.atualizar_titulo()
         self.atualizar_status()
+        self._update_load_progress()
 
     def get_current_tab_meta(self):
         widget = self.editor_tabs.currentWidget()
@@ -558,7 +782,7 @@ class MainWindow(QMainWindow):
         meta = self.get_current_tab_meta()
         if not meta:
             return None
-        return meta["editor"]
+        return meta.get("editor")
 
     def novo_arquivo(self):
         name = f"Untitled-{self.untitled_count}"
@@ -575,18 +799,54 @@ class MainWindow(QMainWindow):
             self.editor_tabs.setCurrentWidget(self.open_file_tabs[path])
             return
 
+        container = self._add_editor_tab(path)
         try:
-            with open(path, "r", encoding="utf-8", errors="ignore") as f:
-                content = f.read()
-            self.criar_aba_editor(path, content)
+            self._load_tab_file(container)
         except Exception as exc:
+            self._close_tab_by_index(self.editor_tabs.indexOf(container), add_to_closed=False)
             QMessageBox.critical(self, "Error", f"Could not open file: {exc}")
+            return
+        self.editor_tabs.setCurrentWidget(container)
+        self.atualizar_titulo()
+        self.atualizar_status()
+        self._update_load_progress()
 
     def criar_aba_editor(self, path, content, forced_name=None):
+        container = self._add_editor_tab(path, forced_name)
+        self._build_editor(container, content)
+        self.editor_tabs.setCurrentWidget(container)
+        self.atualizar_titulo()
+        self.atualizar_status()
+
+    def _add_editor_tab(self, path, forced_name=None):
         container = QWidget()
         layout = QVBoxLayout(container)
         layout.setContentsMargins(4, 4, 4, 4)
 
+        tab_text = forced_name or (os.path.basename(path) if path else f"Untitled-{self.untitled_count}")
+        # "editor" stays None until _build_editor runs; restored tabs are
+        # built when first activated.
+        self.tab_meta[container] = {
+            "path": path,
+            "editor": None,
+            "lang_combo": None,
+            "tab_name": tab_text,
+            "encoding": "utf-8",
+            "newline": None,
+        }
+        if path:
+            self.open_file_tabs[path] = container
+        # addTab makes the first tab current; callers decide when to switch.
+        self.editor_tabs.blockSignals(True)
+        self.editor_tabs.addTab(container, tab_text)
+        self.editor_tabs.blockSignals(False)
+        return container
+
+    def _build_editor(self, container, content):
+        meta = self.tab_meta[container]
+        path = meta["path"]
+        layout = container.layout()
+
         toolbar = QHBoxLayout()
 
         btn_run = QPushButton("Run")
@@ -606,6 +866,8 @@ class MainWindow(QMainWindow):
         layout.addLayout(toolbar)
 
         editor = Editor(self.config_manager)
+        editor.set_workspace_index(self.workspace_index)
+        editor.set_usage_store(self.usage_store)
         editor.set_language(language)
         editor.setPlainText(content or "")
         editor.cursorPositionChanged.connect(self.atualizar_status)
@@ -613,23 +875,94 @@ class MainWindow(QMainWindow):
 
         lang_combo.currentTextChanged.connect(lambda lang, ed=editor: self.mudar_linguagem(ed, lang))
 
-        tab_text = forced_name or (os.path.basename(path) if path else f"Untitled-{self.untitled_count}")
-        index = self.editor_tabs.addTab(container, tab_text)
-        self.editor_tabs.setCurrentIndex(index)
+        meta["editor"] = editor
+        meta["lang_combo"] = lang_combo
+        self.aplicar_tema_ao_editor(editor)
+        return editor
 
-        self.tab_meta[container] = {
-            "path": path,
-            "editor": editor,
-            "lang_combo": lang_combo,
-            "tab_name": tab_text,
-        }
+    def _restore_tabs(self, open_files, active_file=None):
+        # Tabs are added as placeholders; only the active one is read from
+        # disk and gets an Editor now, the rest when first activated.
+        for path in open_files:
+            if path and path not in self.open_file_tabs and os.path.isfile(path):
+                self._add_editor_tab(path)
+        if active_file and active_file in self.open_file_tabs:
+            self.editor_tabs.setCurrentWidget(self.open_file_tabs[active_file])
+        self._on_editor_tab_changed()
 
-        if path:
-            self.open_file_tabs[path] = container
+    def _load_pending_tab(self, container):
+        meta = self.tab_meta.get(container)
+        if not meta or meta["editor"] is not None:
+            return
+        try:
+            self._load_tab_file(container)
+        except Exception as exc:
+            QMessageBox.critical(self, "Error", f"Could not open file: {exc}")
+            self._close_tab_by_index(self.editor_tabs.indexOf(container), add_to_closed=False)
 
-        self.aplicar_tema_ao_editor(editor)
-        self.atualizar_titulo()
-        self.atualizar_status()
+    def _load_tab_file(self, container):
+        meta = self.tab_meta[container]
+        path = meta["path"]
+        if os.path.getsize(path) < ASYNC_LOAD_MIN_SIZE:
+            content, meta["encoding"], meta["newline"] = read_text(path)
+            self._build_editor(container, content)
+            return
+
+        # Large files stream in from a worker thread; the tab stays
+        # read-only until the last chunk arrives.
+        editor = self._build_editor(container, "")
+        editor.begin_streamed_load()
+        loader = FileLoader(path, None, None)
+        loader.on_chunk = lambda chunk, progress, loader=loader: self.file_chunk_loaded.emit(loader, chunk, progress)
+        loader.on_done = lambda result, error, loader=loader: self.file_load_finished.emit(loader, result, error)
+        self._file_loaders[container] = loader
+        loader.start()
+
+    def _container_for_loader(self, loader):
+        for container, candidate in self._file_loaders.items():
+            if candidate is loader:
+                return container
+        return None
+
+    def _on_file_chunk_loaded(self, loader, chunk, progress):
+        container = self._container_for_loader(loader)
+        if container is None:
+            return
+        self.tab_meta[container]["editor"].append_streamed_text(chunk)
+        self.tab_meta[container]["load_progress"] = progress
+        loader.chunk_consumed()
+        if container is self.editor_tabs.currentWidget():
+            self.load_progress.setValue(int(progress * 100))
+
+    def _on_file_load_finished(self, loader, result, error):
+        container = self._container_for_loader(loader)
+        if container is None:
+            return
+        del self._file_loaders[container]
+        meta = self.tab_meta[container]
+        if error is not None:
+            self._close_tab_by_index(self.editor_tabs.indexOf(container), add_to_closed=False)
+            QMessageBox.critical(self, "Error", f"Could not open file: {error}")
+        else:
+            meta["encoding"], meta["newline"], word_index = result
+            meta["editor"].end_streamed_load(word_index)
+            meta.pop("load_progress", None)
+        self._update_load_progress()
+
+    def _cancel_current_file_load(self):
+        container = self.editor_tabs.currentWidget()
+        if container in self._file_loaders:
+            self._close_tab_by_index(self.editor_tabs.indexOf(container), add_to_closed=False)
+
+    def _update_load_progress(self):
+        container = self.editor_tabs.currentWidget()
+        loading = container in self._file_loaders
+        if loading:
+            meta = self.tab_meta[container]
+            self.load_progress.setValue(int(meta.get("load_progress", 0.0) * 100))
+            self.statusBar().showMessage(f"Loading {meta.get('tab_name')}...")
+        self.load_progress.setVisible(loading)
+        self.load_cancel_button.setVisible(loading)
 
     def _close_tab_by_index(self, index, add_to_closed=True):
         widget = self.editor_tabs.widget(index)
@@ -637,9 +970,13 @@ class MainWindow(QMainWindow):
             return
 
         meta = self.tab_meta.pop(widget, None)
+        loader = self._file_loaders.pop(widget, None)
+        if loader is not None:
+            loader.cancel()
         if add_to_closed and meta:
             editor = meta.get("editor")
-            content = editor.toPlainText() if editor else ""
+            # None marks a tab that was never (fully) loaded; reopening reads the file.
+            content = editor.toPlainText() if editor and loader is None else None
             self.closed_tabs.append(
                 {
                     "path": meta.get("path"),
@@ -671,14 +1008,22 @@ class MainWindow(QMainWindow):
             return
         data = self.closed_tabs.pop()
         path = data.get("path")
-        content = data.get("content") or ""
+        content = data.get("content")
         tab_name = data.get("tab_name")
         if path and path in self.open_file_tabs:
             self.editor_tabs.setCurrentWidget(self.open_file_tabs[path])
             return
+        if content is None:
+            if path and os.path.isfile(path):
+                self.abrir_arquivo_por_caminho(path)
+            return
         self.criar_aba_editor(path, content, forced_name=tab_name)
 
-    def salvar_arquivo(self):
+    def salvar_arquivo(self, on_saved=None):
+        """Start saving the current tab; on_saved runs once it is on disk.
+
+        Returns False if nothing will be written.
+        """
         meta = self.get_current_tab_meta()
         if not meta:
             return False
@@ -687,6 +1032,9 @@ class MainWindow(QMainWindow):
         container = self.editor_tabs.currentWidget()
         index = self.editor_tabs.currentIndex()
         path = meta["path"]
+        if container in self._file_loaders:
+            self.statusBar().showMessage("File is still loading; not saved.", 3000)
+            return False
 
         if not path:
             path, _ = QFileDialog.getSaveFileName(self, "Save File")
@@ -726,15 +1074,34 @@ class MainWindow(QMainWindow):
                     editor.setTextCursor(new_cursor)
                     self.statusBar().showMessage(f"Auto-import: {', '.join(added)}", 3000)
 
-            with open(path, "w", encoding="utf-8") as f:
-                f.write(editor.toPlainText())
-            editor.aplicar_syntax_highlight()
+            # Written back in the encoding and line endings it was read with.
+            editor_cfg = self.config_manager.get("editor") or {}
+            self.file_saver.save(
+                path,
+                editor.toPlainText(),
+                meta.get("encoding") or "utf-8",
+                meta.get("newline"),
+                bool(editor_cfg.get("fsync_on_save", True)),
+                on_saved,
+            )
             self.atualizar_titulo()
             return True
         except Exception as exc:
             QMessageBox.critical(self, "Error", f"Could not save file: {exc}")
             return False
 
+    def _on_file_saved(self, path, elapsed, error, callbacks):
+        if error is not None:
+            QMessageBox.critical(self, "Error", f"Could not save file: {error}")
+            return
+        self.workspace_index.update_files([path])
+        if path.endswith(".py"):
+            # The next Run must not get the old code from a warm interpreter.
+            self.process_manager.refresh_python_pool(self.config_manager)
+        self.statusBar().showMessage(f"Saved {os.path.basename(path)} in {elapsed * 1000:.0f} ms", 3000)
+        for callback in callbacks:
+            callback()
+
     def mudar_linguagem(self, editor, lang):
         editor.set_language(lang)
         self.config_manager.set(lang, "current_language")
@@ -791,7 +1158,7 @@ class MainWindow(QMainWindow):
             "QPushButton:hover {"
             f"background-color: {theme['accent_hover']};"
             "}"
-            "QLineEdit, QTextEdit, QComboBox {"
+            "QLineEdit, QTextEdit, QPlainTextEdit#outputView, QComboBox {"
             f"background-color: {theme['entry_bg']};"
             f"color: {theme['fg']};"
             f"border: 1px solid {theme['border']};"
@@ -809,7 +1176,8 @@ class MainWindow(QMainWindow):
 
         self.explorer.apply_theme(theme)
         for meta in self.tab_meta.values():
-            self.aplicar_tema_ao_editor(meta["editor"])
+            if meta["editor"]:
+                self.aplicar_tema_ao_editor(meta["editor"])
 
     def aplicar_tema_ao_editor(self, editor):
         theme_name = self.config_manager.get("theme") or "dark"
@@ -871,16 +1239,19 @@ class MainWindow(QMainWindow):
             return
         editor.insertPlainText(text)
 
-    def write_to_output(self, text):
-        self.output_received.emit(text)
+    def write_to_output(self, text, channel=None):
+        self.output_buffer.write(text, channel)
 
-    def _safe_write_to_output(self, text):
-        target = self.output_box if self.main_tabs.currentWidget() == self.tab_output else self.term_output
-        cursor = target.textCursor()
-        cursor.movePosition(QTextCursor.End)
-        cursor.insertText(text)
-        target.setTextCursor(cursor)
-        target.ensureCursorVisible()
+    def _flush_output(self):
+        for channel, text in self.output_buffer.drain():
+            if channel is None:
+                target = self.output_box if self.main_tabs.currentWidget() == self.tab_output else self.term_output
+            elif isinstance(channel, tuple):
+                target = self._terminal_views.get(channel[1])
+            else:
+                target = self._run_views.get(channel)
+            if target is not None:
+                target.append_output(text)
 
     def atualizar_titulo(self):
         meta = self.get_current_tab_meta()
@@ -916,55 +1287,134 @@ class MainWindow(QMainWindow):
         editor = self.get_current_editor()
         if not editor:
             return
-        if not self.salvar_arquivo():
-            return
-
         meta = self.get_current_tab_meta()
-        path = meta.get("path") if meta else None
+        language = editor.current_language
+        # The file is run once the save has reached the disk.
+        self.salvar_arquivo(on_saved=lambda: self._run_saved_file(meta, language))
+
+    def _run_saved_file(self, meta, language):
+        path = meta.get("path")
         if path and os.path.exists(path):
+            run = self.process_manager.run_code(language, path, self.config_manager)
+            if run is None:
+                return
+            # One log per run: an earlier run of the same file may still be
+            # writing to its own.
+            view = OutputView(f"run-{run.id}-{os.path.basename(path)}")
+            view.open_log_requested.connect(self.abrir_arquivo_por_caminho)
+            self._run_views[run.id] = view
+            self._apply_output_settings()
+            view.clear_output()
+            self.output_tabs.addTab(view, "")
+            self._on_run_state_changed(run)
+            self._prune_run_tabs()
+            self.output_tabs.setCurrentWidget(view)
             self.main_tabs.setCurrentWidget(self.tab_output)
-            self.output_box.clear()
-            self.process_manager.run_code(editor.current_language, path, self.config_manager)
+
+    def _current_run_id(self):
+        """Run shown in the Output tab, else the most recent active run."""
+        view = self.output_tabs.currentWidget()
+        for run_id, run_view in self._run_views.items():
+            if run_view is view:
+                return run_id
+        active = [run.id for run in self.process_manager.scheduler.runs() if run.active]
+        return active[-1] if active else None
+
+    def stop_run(self, kill=False):
+        run_id = self._current_run_id()
+        if run_id is not None:
+            self.process_manager.stop_run(run_id, kill)
+
+    def _on_run_state_changed(self, run):
+        view = self._run_views.get(run.id)
+        if view is not None:
+            if run.state in (QUEUED, RUNNING):
+                status = run.state
+            elif run.state == STOPPED:
+                status = "stopped"
+            elif run.error is not None:
+                status = "error"
+            else:
+                status = f"exit {run.returncode}"
+            self.output_tabs.setTabText(self.output_tabs.indexOf(view), f"{run.name} #{run.id} ({status})")
+        self._update_run_actions()
+
+    def _update_run_actions(self):
+        run_id = self._current_run_id()
+        run = self.process_manager.scheduler.get(run_id) if run_id is not None else None
+        enabled = bool(run and run.active)
+        self.btn_stop_run.setEnabled(enabled)
+        self.btn_kill_run.setEnabled(enabled)
+
+    def _close_run_tab(self, index):
+        view = self.output_tabs.widget(index)
+        run_id = next((key for key, value in self._run_views.items() if value is view), None)
+        if run_id is None:
+            return
+        self.process_manager.stop_run(run_id, kill=True)
+        self.process_manager.scheduler.forget(run_id)
+        del self._run_views[run_id]
+        self.output_tabs.removeTab(index)
+        view.close_log()
+        view.deleteLater()
+
+    def _prune_run_tabs(self):
+        scheduler = self.process_manager.scheduler
+        finished = [
+            run_id for run_id in self._run_views
+            if not (scheduler.get(run_id) and scheduler.get(run_id).active)
+        ]
+        for run_id in finished[: max(0, len(finished) - self.MAX_FINISHED_RUN_TABS)]:
+            self._close_run_tab(self.output_tabs.indexOf(self._run_views[run_id]))
 
     def send_terminal_command(self):
         cmd = self.term_entry.text().strip()
         if not cmd:
             return
 
-        if not self.process_manager.terminal_process:
-            editor = self.get_current_editor()
-            lang = editor.current_language if editor else "python"
-            self.process_manager.start_terminal(lang, self.config_manager)
-
-        self.process_manager.send_terminal_command(cmd)
+        view = self.term_output
+        terminal = self._terminals[view]
+        session_id = terminal["session"]
+        if session_id is None or not self.process_manager.is_terminal_running(session_id):
+            self._terminal_views.pop(session_id, None)
+            session_id = self._start_terminal_session(view)
+        if session_id is not None:
+            self.process_manager.send_terminal_command(session_id, cmd)
+
+        history = terminal["history"]
+        if not history or history[-1] != cmd:
+            history.append(cmd)
+        terminal["history_index"] = len(history)
+        terminal["used"] = True
         if not self._terminal_history or self._terminal_history[-1] != cmd:
             self._terminal_history.append(cmd)
-        self._terminal_history_index = len(self._terminal_history)
         self.term_entry.clear()
         self.main_tabs.setCurrentWidget(self.tab_terminal)
 
     def eventFilter(self, obj, event):
-        if obj == self.term_entry and event.type() == QEvent.KeyPress:
+        if obj == self.term_entry and event.type() == QEvent.KeyPress and self.term_output is not None:
+            terminal = self._terminals[self.term_output]
+            history = terminal["history"]
             if event.key() == Qt.Key_Up:
-                if not self._terminal_history:
+                if not history:
                     return False
-                if self._terminal_history_index == -1:
-                    self._terminal_history_index = len(self._terminal_history) - 1
+                if terminal["history_index"] == -1:
+                    terminal["history_index"] = len(history) - 1
                 else:
-                    self._terminal_history_index = max(0, self._terminal_history_index - 1)
-                self.term_entry.setText(self._terminal_history[self._terminal_history_index])
+                    terminal["history_index"] = max(0, terminal["history_index"] - 1)
+                self.term_entry.setText(history[terminal["history_index"]])
                 self.term_entry.setCursorPosition(len(self.term_entry.text()))
                 return True
             if event.key() == Qt.Key_Down:
-                if not self._terminal_history:
+                if not history:
                     return False
-                if self._terminal_history_index == -1:
+                if terminal["history_index"] == -1:
                     return False
-                self._terminal_history_index = min(len(self._terminal_history), self._terminal_history_index + 1)
-                if self._terminal_history_index >= len(self._terminal_history):
+                terminal["history_index"] = min(len(history), terminal["history_index"] + 1)
+                if terminal["history_index"] >= len(history):
                     self.term_entry.clear()
                 else:
-                    self.term_entry.setText(self._terminal_history[self._terminal_history_index])
+                    self.term_entry.setText(history[terminal["history_index"]])
                     self.term_entry.setCursorPosition(len(self.term_entry.text()))
                 return True
         return super().eventFilter(obj, event)
@@ -1174,4 +1624,12 @@ class MainWindow(QMainWindow):
         if self.extension_manager:
             self.extension_manager.deactivate_all()
         self.process_manager.stop_terminal()
+        self.process_manager.scheduler.stop_all(kill=True)
+        self.process_manager.python_pool.close()
+        self.workspace_index.close()
+        self.usage_store.close()
+        self.file_saver.wait(10)
+        self.output_buffer.close()
+        for view in [self.output_box, *self._terminals, *self._run_views.values()]:
+            view.close_log()
         super().closeEvent(event)
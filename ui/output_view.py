@@ -0,0 +1,99 @@
+from PySide6.QtCore import Signal
+from PySide6.QtGui import QTextCursor
+from PySide6.QtWidgets import QPlainTextEdit
+
+from utils.output_log import OutputLog
+
+
+DEFAULT_MAX_LINES = 10000
+
+
+class OutputView(QPlainTextEdit):
+    """Read-only pane for process output with a bounded scrollback.
+
+    Lines beyond max_lines are dropped from the top, so memory and layout
+    cost stay flat however long a process runs. The excess is removed with
+    one selection per append rather than through setMaximumBlockCount(),
+    which trims block by block and makes large appends several times
+    slower. With a log path set, all output is also appended to an
+    OutputLog that "Open Full Log" in the context menu hands to
+    open_log_requested.
+    """
+
+    open_log_requested = Signal(str)
+    # (columns, rows) that fit in the viewport, emitted on resize.
+    size_changed = Signal(int, int)
+
+    def __init__(self, log_name="output", parent=None):
+        super().__init__(parent)
+        self.log_name = log_name
+        self.setReadOnly(True)
+        self.setUndoRedoEnabled(False)
+        self.setObjectName("outputView")
+        self.max_lines = DEFAULT_MAX_LINES
+        self.output_log = None
+
+    def set_scrollback(self, max_lines, log_path=None):
+        self.max_lines = max(0, int(max_lines or 0))
+        self._trim()
+        current = self.output_log.path if self.output_log else None
+        if log_path == current:
+            return
+        if self.output_log:
+            self.output_log.close()
+        self.output_log = OutputLog(log_path) if log_path else None
+
+    def append_output(self, text):
+        if self.output_log:
+            try:
+                self.output_log.write(text)
+            except OSError as exc:
+                print(f"[output] Could not write {self.output_log.path}: {exc}")
+                self.output_log = None
+        if self.max_lines and text.count("\n") >= self.max_lines:
+            text = "\n".join(text.split("\n")[-self.max_lines:])
+        cursor = self.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text)
+        self._trim()
+        self.setTextCursor(cursor)
+        self.ensureCursorVisible()
+
+    def _trim(self):
+        document = self.document()
+        extra = document.blockCount() - self.max_lines
+        if self.max_lines and extra > 0:
+            cursor = QTextCursor(document)
+            cursor.setPosition(document.findBlockByNumber(extra).position(), QTextCursor.KeepAnchor)
+            cursor.removeSelectedText()
+
+    def clear_output(self):
+        self.clear()
+        if self.output_log:
+            try:
+                self.output_log.clear()
+            except OSError as exc:
+                print(f"[output] Could not clear {self.output_log.path}: {exc}")
+
+    def close_log(self):
+        if self.output_log:
+            self.output_log.close()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        metrics = self.fontMetrics()
+        columns = self.viewport().width() // max(1, metrics.horizontalAdvance("M"))
+        rows = self.viewport().height() // max(1, metrics.lineSpacing())
+        self.size_changed.emit(max(20, columns), max(5, rows))
+
+    def contextMenuEvent(self, event):
+        menu = self.createStandardContextMenu()
+        if self.output_log:
+            menu.addSeparator()
+            action = menu.addAction("Open Full Log")
+            action.triggered.connect(self._request_log)
+        menu.exec(event.globalPos())
+
+    def _request_log(self):
+        self.output_log.flush()
+        self.open_log_requested.emit(self.output_log.path)
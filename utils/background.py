@@ -0,0 +1,47 @@
+import threading
+
+
+class CoalescingWorker:
+    """Run func(*args) on a daemon thread for the most recent request only.
+
+    Requests submitted while func is busy replace each other, so a burst of
+    submissions costs at most one extra run with the newest arguments.
+    """
+
+    def __init__(self, func, name=None):
+        self._func = func
+        self._name = name
+        self._cond = threading.Condition()
+        self._pending = None
+        self._closed = False
+        self._thread = None
+
+    def submit(self, *args):
+        with self._cond:
+            if self._closed:
+                return
+            self._pending = args
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._pending = None
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                args = self._pending
+                self._pending = None
+            try:
+                self._func(*args)
+            except Exception as exc:
+                print(f"[{self._name or 'worker'}] {exc}")
@@ -0,0 +1,84 @@
+import re
+from bisect import bisect_left, bisect_right
+
+from utils.tokenizer import TOKEN_COMMENT, TOKEN_STRING
+
+
+BRACKET_PAIRS = {"(": ")", "[": "]", "{": "}", ")": "(", "]": "[", "}": "{"}
+OPENERS = "([{"
+
+_BRACKET_PATTERN = re.compile(r"[()\[\]{}]")
+_SKIPPED_TOKENS = (TOKEN_STRING, TOKEN_COMMENT)
+
+# (columns, chars, balances) for a line without brackets.
+EMPTY_RECORD = ((), "", {})
+
+
+def bracket_record(text, spans=()):
+    """Summarize the brackets of one line that are outside strings/comments.
+
+    Returns (columns, chars, balances): the bracket columns in order, the
+    matching bracket characters, and for each opener character the pair
+    (unmatched closers from the left, unmatched openers at the right end).
+    """
+    if not _BRACKET_PATTERN.search(text):
+        return EMPTY_RECORD
+    skipped = [(start, start + length) for start, length, kind in spans if kind in _SKIPPED_TOKENS]
+    columns = []
+    chars = []
+    span_index = 0
+    for match in _BRACKET_PATTERN.finditer(text):
+        column = match.start()
+        while span_index < len(skipped) and skipped[span_index][1] <= column:
+            span_index += 1
+        if span_index < len(skipped) and skipped[span_index][0] <= column:
+            continue
+        columns.append(column)
+        chars.append(match.group())
+    if not columns:
+        return EMPTY_RECORD
+
+    chars = "".join(chars)
+    balances = {}
+    for opener in OPENERS:
+        closer = BRACKET_PAIRS[opener]
+        if opener not in chars and closer not in chars:
+            continue
+        unmatched_closers = 0
+        depth = 0
+        for ch in chars:
+            if ch == opener:
+                depth += 1
+            elif ch == closer:
+                if depth:
+                    depth -= 1
+                else:
+                    unmatched_closers += 1
+        balances[opener] = (unmatched_closers, depth)
+    return tuple(columns), chars, balances
+
+
+def scan_record(record, bracket, depth, forward, column=None):
+    """Walk the brackets of one line looking for the partner of bracket.
+
+    depth is the number of brackets still to close; column, when given,
+    excludes brackets at or before (forward) / at or after (backward) it.
+    Returns (match_column or None, remaining depth).
+    """
+    columns, chars, _ = record
+    partner = BRACKET_PAIRS[bracket]
+    if forward:
+        start = 0 if column is None else bisect_right(columns, column)
+        indices = range(start, len(columns))
+    else:
+        end = len(columns) if column is None else bisect_left(columns, column)
+        indices = range(end - 1, -1, -1)
+    for i in indices:
+        ch = chars[i]
+        if ch == bracket:
+            depth += 1
+        elif ch == partner:
+            depth -= 1
+            if depth == 0:
+                return columns[i], 0
+    return None, depth
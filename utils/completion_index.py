@@ -0,0 +1,91 @@
+import heapq
+from bisect import bisect_left
+
+
+class CompletionIndex:
+    """Completion vocabulary sorted by lowercase form for prefix lookups.
+
+    Each word also carries a precomputed static score (the part of its rank
+    that does not depend on the prefix being typed), which lets top_k() pick
+    the best candidates of a prefix range without scoring all of them.
+    """
+
+    def __init__(self, words=(), static_score=None):
+        self._static_score = static_score
+        self.rebuild(words)
+
+    def __len__(self):
+        return len(self.words)
+
+    def rebuild(self, words):
+        entries = sorted({(word.lower(), word) for word in words})
+        self.lower = [entry[0] for entry in entries]
+        self.words = [entry[1] for entry in entries]
+        self._positions = {word: i for i, word in enumerate(self.words)}
+        if self._static_score:
+            self.static = [self._static_score(word) for word in self.words]
+        else:
+            self.static = [0.0] * len(self.words)
+
+    def refresh_scores(self, words):
+        if not self._static_score:
+            return
+        positions = self._positions
+        # Copied on write: a reader holding the previous list keeps a
+        # consistent set of scores.
+        static = list(self.static)
+        for word in words:
+            i = positions.get(word)
+            if i is not None:
+                static[i] = self._static_score(word)
+        self.static = static
+
+    def static_score_of(self, word, static=None):
+        """Stored static score of word, or None if it is not indexed.
+
+        static is a list read from self.static earlier, to use the scores as
+        they were then.
+        """
+        i = self._positions.get(word)
+        if i is None:
+            return None
+        return (self.static if static is None else static)[i]
+
+    def prefix_range(self, prefix):
+        key = prefix.lower()
+        lo = bisect_left(self.lower, key)
+        hi = bisect_left(self.lower, key + "\U0010ffff", lo)
+        return lo, hi
+
+    def prefix_matches(self, prefix, limit=None):
+        """Words starting with prefix (case-insensitive), alphabetically."""
+        lo, hi = self.prefix_range(prefix)
+        if limit:
+            hi = min(hi, lo + limit)
+        return self.words[lo:hi]
+
+    def top_k(self, prefix, k, score, boosted=()):
+        """Return up to k prefix matches ordered by descending score.
+
+        score(word) must equal the word's static score plus a non-negative
+        bonus that is the same for every match, except for words listed in
+        boosted. Only the k best static scores and the boosted words are
+        passed to score().
+        """
+        lo, hi = self.prefix_range(prefix)
+        static = self.static
+        if not k or hi - lo <= k:
+            picked = range(lo, hi)
+        else:
+            picked = set(heapq.nlargest(k, range(lo, hi), key=static.__getitem__))
+            positions = self._positions
+            for word in boosted:
+                i = positions.get(word)
+                if i is not None and lo <= i < hi:
+                    picked.add(i)
+        words = self.words
+        lower = self.lower
+        ranked = sorted(picked, key=lambda i: (-score(words[i]), lower[i]))
+        if k:
+            ranked = ranked[:k]
+        return [words[i] for i in ranked]
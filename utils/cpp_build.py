@@ -0,0 +1,316 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+SOURCE_EXTENSIONS = (".cpp", ".cc", ".cxx", ".c++")
+# Objects kept in a cache directory; the least recently used go first.
+MAX_CACHED_OBJECTS = 512
+
+_INCLUDE_RE = re.compile(rb'^[ \t]*#[ \t]*include[ \t]*(?:"([^"\n]+)"|<([^>\n]+)>)', re.M)
+# A file name in a make rule written by -MMD, with "\ " for spaces.
+_DEPENDENCY_RE = re.compile(r"(?:\\.|[^\s\\])+")
+_manifest_lock = threading.Lock()
+
+
+def _include_dirs(flags):
+    """The -iquote and -I folders of flags, as absolute paths."""
+    quote_dirs, include_dirs = [], []
+    flags = list(flags)
+    for index, flag in enumerate(flags):
+        for option, target in (("-iquote", quote_dirs), ("-I", include_dirs)):
+            if flag == option and index + 1 < len(flags):
+                target.append(os.path.abspath(flags[index + 1]))
+            elif flag.startswith(option) and flag != option:
+                target.append(os.path.abspath(flag[len(option):]))
+            else:
+                continue
+            break
+    return quote_dirs, include_dirs
+
+
+def _read_dependencies(path):
+    """Files listed in the make rule written by -MMD, as absolute paths."""
+    with open(path, "r", encoding="utf-8", errors="surrogateescape") as f:
+        text = f.read().replace("\\\n", " ")
+    _target, _colon, text = text.partition(":")
+    dependencies = []
+    for token in _DEPENDENCY_RE.findall(text):
+        name = re.sub(r"\\([ #])", r"\1", token).replace("$$", "$")
+        path = os.path.abspath(name)
+        if path not in dependencies:
+            dependencies.append(path)
+    return dependencies
+
+
+def cpp_cache_dir(root_path, file_path):
+    """Build cache of file_path: under .lcoder of its workspace, or the temp dir."""
+    if root_path and os.path.abspath(file_path).startswith(os.path.join(os.path.abspath(root_path), "")):
+        return os.path.join(root_path, ".lcoder", "cpp-cache")
+    return os.path.join(tempfile.gettempdir(), "lcoder-cpp-cache")
+
+
+class CppBuild:
+    """Compile and link a C++ program, reusing objects whose inputs did not change.
+
+    The translation units are the source being run plus, transitively, every
+    source next to a header it includes, looked up like the compiler would
+    in its folder and the -iquote/-I folders (main.cpp including "shape.h"
+    pulls in shape.cpp). Each object is cached under a hash of the compiler,
+    the flags and the contents of the files the compiler listed as its
+    dependencies (-MMD) the last time it compiled that unit; stale objects
+    are compiled in parallel on up to `jobs` processes, and the program is
+    relinked only when its set of objects changed. System headers are
+    covered by the compiler's identity.
+
+    write(text) receives the compiler output, on_process(process) every
+    process started and should_stop() is checked before starting each one.
+    """
+
+    def __init__(self, compiler, flags=(), cache_dir=None, jobs=None, write=print, on_process=None, should_stop=None):
+        self.compiler = compiler
+        self.flags = list(flags)
+        self.cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), "lcoder-cpp-cache")
+        self.jobs = max(1, jobs or os.cpu_count() or 1)
+        self.write = write
+        self.on_process = on_process
+        self.should_stop = should_stop or (lambda: False)
+        self._includes = {}
+        self._quote_dirs, self._include_dirs = _include_dirs(self.flags)
+
+    def build(self, source, output_path):
+        """Build output_path from source; returns the failing exit code or 0."""
+        source = os.path.abspath(source)
+        objects_dir = os.path.join(self.cache_dir, "objects")
+        os.makedirs(objects_dir, exist_ok=True)
+        os.makedirs(os.path.join(self.cache_dir, "deps"), exist_ok=True)
+        compiler_id = self._compiler_identity()
+
+        # [unit, dependencies of its last compile, cached object or None]
+        units = []
+        for unit in self._translation_units(source):
+            dependencies = self._recorded_dependencies(compiler_id, unit)
+            obj = None
+            if dependencies is not None:
+                key = self._object_key(compiler_id, unit, dependencies)
+                obj = key and os.path.join(objects_dir, key + ".o")
+            units.append([unit, dependencies, obj])
+
+        stale = [entry for entry in units if entry[2] is None or not os.path.exists(entry[2])]
+        returncode = self._compile_all(stale, compiler_id, objects_dir)
+        if returncode:
+            return returncode
+        self.write(f"[build] {len(stale)} compiled, {len(units) - len(stale)} cached\n")
+
+        objects = [obj for _unit, _dependencies, obj in units]
+        for obj in objects:
+            os.utime(obj)
+        link_key = hashlib.sha256("\0".join([compiler_id] + self.flags + objects).encode("utf-8")).hexdigest()
+        if self._linked(output_path, link_key):
+            self.write("[build] up to date\n")
+            return 0
+        returncode = self._run([self.compiler] + objects + ["-o", output_path] + self.flags)
+        if returncode == 0:
+            self._record_link(output_path, link_key)
+            self._prune(objects_dir)
+        return returncode
+
+    def _compile_all(self, stale, compiler_id, objects_dir):
+        if not stale:
+            return 0
+        failures = []
+        lock = threading.Lock()
+
+        def compile_unit(entry):
+            if failures or self.should_stop():
+                return
+            unit, dependencies, obj = entry
+            fd, temp_obj = tempfile.mkstemp(suffix=".o.tmp", dir=objects_dir)
+            os.close(fd)
+            temp_deps = temp_obj + ".d"
+            try:
+                returncode = self._run(
+                    [self.compiler, "-c", unit, "-o", temp_obj, "-MMD", "-MF", temp_deps, "-MT", "obj"] + self.flags
+                )
+                if returncode == 0:
+                    compiled = _read_dependencies(temp_deps)
+                    # Keyed by the contents read before compiling when the
+                    # dependencies are the same, so an edit made meanwhile
+                    # is compiled again next time.
+                    if obj is None or compiled != dependencies:
+                        key = self._object_key(compiler_id, unit, compiled)
+                        obj = key and os.path.join(objects_dir, key + ".o")
+                    if obj:
+                        os.replace(temp_obj, obj)
+                        self._record_dependencies(compiler_id, unit, compiled)
+                        entry[1:] = [compiled, obj]
+                        return
+                    self.write(f"[build] {unit}: a dependency was removed while compiling\n")
+                    returncode = 1
+                with lock:
+                    failures.append(returncode)
+            finally:
+                for path in (temp_obj, temp_deps):
+                    if path and os.path.exists(path):
+                        os.unlink(path)
+
+        with ThreadPoolExecutor(max_workers=min(self.jobs, len(stale))) as pool:
+            for future in [pool.submit(compile_unit, entry) for entry in stale]:
+                future.result()
+        if failures:
+            return failures[0]
+        return 1 if self.should_stop() else 0
+
+    def _run(self, args):
+        if self.should_stop():
+            return 1
+        process = subprocess.Popen(
+            args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            errors="replace",
+            creationflags=subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0,
+            start_new_session=os.name != "nt",
+        )
+        if self.on_process:
+            self.on_process(process)
+        # Collected whole so messages of parallel compiles do not interleave.
+        output, _ = process.communicate()
+        if output:
+            self.write(output)
+        return process.returncode
+
+    def _compiler_identity(self):
+        path = shutil.which(self.compiler) or self.compiler
+        try:
+            stat = os.stat(path)
+            return f"{os.path.realpath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+        except OSError:
+            return path
+
+    def _object_key(self, compiler_id, unit, dependencies):
+        """Hash of the inputs of unit's object, or None if a file is missing."""
+        digest = hashlib.sha256()
+        for part in (compiler_id, "\0".join(self.flags), unit):
+            digest.update(part.encode("utf-8") + b"\0")
+        for path in [unit] + sorted(set(dependencies) - {unit}):
+            try:
+                with open(path, "rb") as f:
+                    content = f.read()
+            except OSError:
+                return None
+            digest.update(path.encode("utf-8", "surrogateescape") + b"\0" + hashlib.sha256(content).digest())
+        return digest.hexdigest()
+
+    def _dependencies_path(self, compiler_id, unit):
+        key = hashlib.sha256("\0".join([compiler_id, unit] + self.flags).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, "deps", key + ".json")
+
+    def _recorded_dependencies(self, compiler_id, unit):
+        try:
+            with open(self._dependencies_path(compiler_id, unit), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _record_dependencies(self, compiler_id, unit, dependencies):
+        path = self._dependencies_path(compiler_id, unit)
+        fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path))
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(dependencies, f)
+        os.replace(temp_path, path)
+
+    def _translation_units(self, source):
+        units = [source]
+        for unit in units:
+            for header in sorted(self._local_includes(unit)):
+                stem = os.path.splitext(header)[0]
+                for extension in SOURCE_EXTENSIONS:
+                    candidate = stem + extension
+                    if candidate not in units and os.path.exists(candidate):
+                        units.append(candidate)
+        return units
+
+    def _local_includes(self, path):
+        """Project files reachable from path through #include lines."""
+        found = set()
+        pending = [path]
+        while pending:
+            current = pending.pop()
+            for header in self._direct_includes(current):
+                if header not in found:
+                    found.add(header)
+                    pending.append(header)
+        found.discard(path)
+        return found
+
+    def _direct_includes(self, path):
+        cached = self._includes.get(path)
+        if cached is None:
+            try:
+                with open(path, "rb") as f:
+                    names = _INCLUDE_RE.findall(f.read())
+            except OSError:
+                names = []
+            cached = []
+            for quoted, angled in names:
+                if quoted:
+                    name = quoted.decode("utf-8", "replace")
+                    folders = [os.path.dirname(path)] + self._quote_dirs + self._include_dirs
+                else:
+                    name = angled.decode("utf-8", "replace")
+                    folders = self._include_dirs
+                for folder in folders:
+                    candidate = os.path.normpath(os.path.join(folder, name))
+                    if os.path.isfile(candidate):
+                        cached.append(candidate)
+                        break
+            self._includes[path] = cached
+        return cached
+
+    def _manifest_path(self):
+        return os.path.join(self.cache_dir, "links.json")
+
+    def _read_manifest(self):
+        try:
+            with open(self._manifest_path(), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _linked(self, output_path, link_key):
+        with _manifest_lock:
+            entry = self._read_manifest().get(os.path.abspath(output_path))
+        try:
+            stat = os.stat(output_path)
+        except OSError:
+            return False
+        return entry == [link_key, stat.st_size, stat.st_mtime_ns]
+
+    def _record_link(self, output_path, link_key):
+        stat = os.stat(output_path)
+        with _manifest_lock:
+            manifest = self._read_manifest()
+            manifest[os.path.abspath(output_path)] = [link_key, stat.st_size, stat.st_mtime_ns]
+            temp_path = self._manifest_path() + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+            os.replace(temp_path, self._manifest_path())
+
+    def _prune(self, objects_dir):
+        try:
+            entries = [entry for entry in os.scandir(objects_dir) if entry.name.endswith(".o")]
+            if len(entries) <= MAX_CACHED_OBJECTS:
+                return
+            entries.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in entries[: len(entries) - MAX_CACHED_OBJECTS]:
+                os.unlink(entry.path)
+        except OSError:
+            pass
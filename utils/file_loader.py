@@ -0,0 +1,152 @@
+import codecs
+import io
+import os
+import threading
+
+from utils.word_index import WordIndex
+
+
+# Files at least this large are opened with a FileLoader instead of a
+# blocking read.
+ASYNC_LOAD_MIN_SIZE = 2 * 1024 * 1024
+# Characters per chunk handed to the GUI thread.
+CHUNK_CHARS = 128 * 1024
+# Chunks emitted but not yet consumed before the reader waits.
+MAX_CHUNKS_IN_FLIGHT = 2
+READ_SIZE = 4 * 1024 * 1024
+
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+# Tried in order when there is no BOM; latin-1 decodes any byte sequence.
+FALLBACK_ENCODINGS = ("utf-8", "cp1252", "latin-1")
+
+
+class LoadCancelled(Exception):
+    pass
+
+
+def _decodes(path, encoding, cancelled=None):
+    decoder = codecs.getincrementaldecoder(encoding)()
+    with open(path, "rb") as f:
+        while True:
+            if cancelled is not None and cancelled.is_set():
+                raise LoadCancelled()
+            data = f.read(READ_SIZE)
+            try:
+                decoder.decode(data, final=not data)
+            except UnicodeDecodeError:
+                return False
+            if not data:
+                return True
+
+
+def detect_encoding(path, cancelled=None):
+    """Encoding of a text file: its BOM, else the first that decodes it all."""
+    with open(path, "rb") as f:
+        head = f.read(4)
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+    for encoding in FALLBACK_ENCODINGS[:-1]:
+        if _decodes(path, encoding, cancelled):
+            return encoding
+    return FALLBACK_ENCODINGS[-1]
+
+
+def detect_newline(newlines):
+    """Line ending to write back, from TextIOWrapper.newlines."""
+    if isinstance(newlines, tuple):
+        return "\r\n" if "\r\n" in newlines else newlines[0]
+    return newlines or "\n"
+
+
+def read_text(path):
+    """Read a whole file; returns (text, encoding, newline).
+
+    The text uses "\\n" line endings, as QPlainTextEdit expects.
+    """
+    encoding = detect_encoding(path)
+    with open(path, "r", encoding=encoding, newline=None) as f:
+        text = f.read()
+        newline = detect_newline(f.newlines)
+    return text, encoding, newline
+
+
+class FileLoader:
+    """Read a text file on a daemon thread and hand it over in chunks.
+
+    on_chunk(text, progress) receives the text in order, in pieces cut after
+    a newline unless a line is longer than chunk_chars; the reader pauses
+    once MAX_CHUNKS_IN_FLIGHT chunks were sent until chunk_consumed() is
+    called for them. on_done(result, error) is called
+    last, with result = (encoding, newline, word_index) on success. Both
+    callbacks run on the reader thread. After cancel() neither is called
+    again.
+    """
+
+    def __init__(self, path, on_chunk, on_done, chunk_chars=CHUNK_CHARS):
+        self.path = path
+        self.on_chunk = on_chunk
+        self.on_done = on_done
+        self.chunk_chars = chunk_chars
+        self._cancelled = threading.Event()
+        self._slots = threading.Semaphore(MAX_CHUNKS_IN_FLIGHT)
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def cancel(self):
+        self._cancelled.set()
+        self._slots.release()
+
+    def chunk_consumed(self):
+        self._slots.release()
+
+    def _run(self):
+        try:
+            result = self._read()
+        except LoadCancelled:
+            return
+        except Exception as exc:
+            if not self._cancelled.is_set():
+                self.on_done(None, exc)
+            return
+        if not self._cancelled.is_set():
+            self.on_done(result, None)
+
+    def _read(self):
+        size = max(1, os.path.getsize(self.path))
+        encoding = detect_encoding(self.path, self._cancelled)
+        # Words are indexed here so the editor does not rescan the document.
+        word_index = WordIndex()
+        word_index.reset([""])
+        pending = ""
+        with open(self.path, "rb") as raw:
+            reader = io.TextIOWrapper(raw, encoding=encoding, newline=None)
+            while True:
+                piece = reader.read(self.chunk_chars)
+                pending += piece
+                cut = pending.rfind("\n") + 1 if piece else len(pending)
+                if not cut and len(pending) >= self.chunk_chars:
+                    # A very long line (minified code, one-line JSON) is
+                    # handed over in pieces rather than accumulated.
+                    cut = len(pending)
+                if cut:
+                    chunk, pending = pending[:cut], pending[cut:]
+                    word_index.append_text(chunk)
+                    self._emit(chunk, min(1.0, raw.tell() / size))
+                if not piece:
+                    break
+            newline = detect_newline(reader.newlines)
+        return encoding, newline, word_index
+
+    def _emit(self, chunk, progress):
+        self._slots.acquire()
+        if self._cancelled.is_set():
+            raise LoadCancelled()
+        self.on_chunk(chunk, progress)
@@ -0,0 +1,142 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+
+def write_atomic(path, text, encoding="utf-8", newline=None, fsync=True):
+    """Write text to path through a temporary file renamed over it.
+
+    newline is the line ending to write ("\\n" text is translated, None means
+    os.linesep, like open() in text mode). A crash leaves either the old or
+    the new file, never a truncated one. A symlink is followed and the file
+    it points to is replaced; the new file keeps the old one's mode and,
+    where permitted, its owner. A file with several hard links is rewritten
+    in place, without that guarantee, as a rename would detach it from its
+    other names.
+    """
+    newline = os.linesep if newline is None else newline
+    if newline != "\n":
+        text = text.replace("\n", newline)
+    data = text.encode(encoding)
+    path = os.path.realpath(path)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        stat = None
+    if stat is not None and stat.st_nlink > 1:
+        with open(path, "r+b") as f:
+            f.write(data)
+            f.truncate()
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        return
+    folder = os.path.dirname(path)
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=folder)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        if stat is not None:
+            shutil.copymode(path, temp_path)
+            if hasattr(os, "chown") and (stat.st_uid, stat.st_gid) != (os.getuid(), os.getgid()):
+                try:
+                    os.chown(temp_path, stat.st_uid, stat.st_gid)
+                except OSError:
+                    pass
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+    if fsync:
+        _fsync_directory(folder)
+
+
+def _fsync_directory(folder):
+    # Makes the rename itself durable; directories cannot be opened on Windows.
+    if os.name == "nt":
+        return
+    fd = os.open(folder, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class FileSaver:
+    """Write files with write_atomic() on a daemon thread, in request order.
+
+    A save requested while an earlier one of the same path is still queued
+    replaces its text, so a burst of saves costs at most the write in flight
+    plus one more. on_done(path, elapsed, error, callbacks) is called on the
+    worker thread after each write, with the callbacks of every request the
+    write covered.
+    """
+
+    def __init__(self, on_done=None):
+        self.on_done = on_done
+        self._cond = threading.Condition()
+        # path -> [text, encoding, newline, fsync, callbacks], in request order
+        self._queue = {}
+        self._busy = False
+        self._thread = None
+
+    def save(self, path, text, encoding="utf-8", newline=None, fsync=True, callback=None):
+        with self._cond:
+            job = self._queue.get(path)
+            callbacks = job[4] if job else []
+            if callback is not None:
+                callbacks.append(callback)
+            self._queue[path] = [text, encoding, newline, fsync, callbacks]
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="file-saver", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def is_pending(self, path):
+        with self._cond:
+            return path in self._queue
+
+    def wait(self, timeout=None):
+        """Block until every requested save has been written."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._queue or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                path = next(iter(self._queue))
+                text, encoding, newline, fsync, callbacks = self._queue.pop(path)
+                self._busy = True
+            start = time.perf_counter()
+            error = None
+            try:
+                write_atomic(path, text, encoding, newline, fsync)
+            except Exception as exc:
+                error = exc
+            elapsed = time.perf_counter() - start
+            if self.on_done:
+                try:
+                    self.on_done(path, elapsed, error, callbacks)
+                except Exception as exc:
+                    print(f"[file-saver] {exc}")
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
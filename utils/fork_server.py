@@ -0,0 +1,163 @@
+"""Fork server run by a project's Python interpreter (POSIX only).
+
+Started by utils.python_pool as ``python fork_server.py SOCKET [MODULE,...]``.
+It imports the given modules once, prints the workspace source files they
+loaded ("workspace-modules" and a JSON object of path to mtime), "ready" and
+then, for every connection on the Unix socket SOCKET, forks a child that runs
+the requested script with the stdin/stdout/stderr descriptors passed along
+with the request. The child's pid is sent back on the connection right away
+and its exit code once it finishes. Once its stdin is closed, which happens
+when the IDE goes away or restarts it, the server stops accepting requests
+and exits after its last child.
+
+Only the standard library may be used here: the script runs inside the
+project's virtual environment, not the IDE's.
+"""
+
+import json
+import os
+import selectors
+import signal
+import socket
+import sys
+import traceback
+
+
+def _run_child(request, fds):
+    os.setsid()
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    for target, fd in enumerate(fds):
+        os.dup2(fd, target)
+        os.close(fd)
+    code = 0
+    try:
+        os.environ.update(request.get("env") or {})
+        if request.get("cwd"):
+            os.chdir(request["cwd"])
+        if request.get("unbuffered"):
+            sys.stdout = open(1, "w", buffering=1, encoding=sys.stdout.encoding, errors=sys.stdout.errors, closefd=False)
+            sys.stdout.reconfigure(write_through=True)
+        else:
+            sys.stdout = open(1, "w", encoding=sys.stdout.encoding, errors=sys.stdout.errors, closefd=False)
+        sys.stderr = open(2, "w", buffering=1, encoding=sys.stderr.encoding, errors="backslashreplace", closefd=False)
+        sys.stdin = open(0, "r", closefd=False)
+        if "random" in sys.modules:
+            # Forked children would otherwise share the server's random state.
+            sys.modules["random"].seed()
+
+        import runpy
+
+        script = request["script"]
+        sys.argv = [script] + list(request.get("args") or [])
+        sys.path[0] = os.path.dirname(os.path.abspath(script))
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit as exc:
+        if exc.code is None:
+            code = 0
+        elif isinstance(exc.code, int):
+            code = exc.code
+        else:
+            print(exc.code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except Exception:
+            pass
+        os._exit(code)
+
+
+def _send(conn, message):
+    try:
+        conn.sendall((json.dumps(message) + "\n").encode("utf-8"))
+    except OSError:
+        pass
+
+
+def _workspace_modules(root):
+    # Files of the interpreter's own environment may live in the workspace
+    # too (a .venv folder); those do not change while editing.
+    root = os.path.realpath(root) + os.sep
+    environment = tuple({os.path.realpath(sys.prefix) + os.sep, os.path.realpath(sys.base_prefix) + os.sep})
+    files = {}
+    for module in list(sys.modules.values()):
+        path = getattr(module, "__file__", None)
+        if not path:
+            continue
+        path = os.path.realpath(path)
+        if path.startswith(root) and not path.startswith(environment):
+            try:
+                files[path] = os.stat(path).st_mtime_ns
+            except OSError:
+                pass
+    return files
+
+
+def serve(socket_path, modules):
+    # Resolve the preloads like "python -c" would, from the working folder
+    # (the workspace) rather than from this file's folder.
+    sys.path[0] = os.getcwd()
+    for name in modules:
+        try:
+            __import__(name)
+        except Exception as exc:
+            print(f"preload of {name} failed: {exc}", flush=True)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen()
+    selector = selectors.DefaultSelector()
+    selector.register(listener, selectors.EVENT_READ)
+    selector.register(sys.stdin.fileno(), selectors.EVENT_READ)
+    children = {}
+    print("workspace-modules " + json.dumps(_workspace_modules(os.getcwd())), flush=True)
+    print("ready", flush=True)
+    closing = False
+    while not closing or children:
+        for key, _events in selector.select(timeout=0.05):
+            if key.fileobj is not listener:
+                if not os.read(key.fd, 4096):
+                    # Runs already forked still report their exit code.
+                    selector.unregister(listener)
+                    selector.unregister(key.fd)
+                    listener.close()
+                    os.unlink(socket_path)
+                    closing = True
+                    break
+                continue
+            conn, _address = listener.accept()
+            try:
+                data, fds, _flags, _address = socket.recv_fds(conn, 1 << 16, 3)
+                request = json.loads(data.decode("utf-8"))
+            except (OSError, ValueError) as exc:
+                print(f"bad request: {exc}", flush=True)
+                conn.close()
+                continue
+            pid = os.fork()
+            if pid == 0:
+                listener.close()
+                conn.close()
+                _run_child(request, fds)
+            for fd in fds:
+                os.close(fd)
+            children[pid] = conn
+            _send(conn, {"pid": pid})
+        while children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            conn = children.pop(pid, None)
+            if conn is not None:
+                _send(conn, {"exit": os.waitstatus_to_exitcode(status)})
+                conn.close()
+
+
+if __name__ == "__main__":
+    serve(sys.argv[1], [name for name in (sys.argv[2] if len(sys.argv) > 2 else "").split(",") if name])
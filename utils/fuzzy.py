@@ -0,0 +1,239 @@
+import heapq
+import re
+import time
+from bisect import bisect_left
+from collections import Counter
+
+
+# match() returns at most this many matches, the best scoring ones.
+FUZZY_SCORE_LIMIT = 200
+# Per query, at most this many more words are filtered and this many of
+# the survivors scored, so a keystroke costs the same at any vocabulary size.
+SCAN_LIMIT = 4096
+MAX_SCORED = 256
+# Words filtered, and matches scored, between two checks of the deadline.
+SCAN_CHUNK = 4096
+SCORE_CHUNK = 256
+# Searches kept for queries typed against the same candidate list.
+MAX_CACHED_QUERIES = 32
+
+_HUMP_PATTERN = re.compile(r"^[A-Za-z0-9]|(?<=_)[A-Za-z0-9]|(?<=[a-z0-9])[A-Z]")
+# Matches every hump initial and newline, so findall() over a newline-joined
+# word list yields the initials of all words in one call.
+_INITIAL_PATTERN = re.compile(r"\n|(?<![A-Za-z0-9])[A-Za-z0-9]|(?<=[a-z0-9])[A-Z]")
+
+
+def hump_positions(word):
+    """Sorted indices where a camelCase or snake_case segment starts."""
+    return [m.start() for m in _HUMP_PATTERN.finditer(word)]
+
+
+def _alignment_score(lower, humps, hump_set, query, prefer_humps):
+    score = 0.0
+    prev = -1
+    pos = 0
+    h = 0
+    for ch in query:
+        index = -1
+        if prefer_humps and not (prev == pos - 1 and lower.startswith(ch, pos)):
+            while h < len(humps) and humps[h] < pos:
+                h += 1
+            for hump in humps[h:]:
+                if lower[hump] == ch:
+                    index = hump
+                    break
+        if index == -1:
+            index = lower.find(ch, pos)
+            if index == -1:
+                return None
+        if index == 0:
+            score += 2.0
+        elif index in hump_set:
+            score += 1.5
+        if index == prev + 1:
+            score += 1.0
+        else:
+            score -= 0.1 * min(index - prev - 1, 10)
+        prev = index
+        pos = index + 1
+    return score
+
+
+def fuzzy_score(word, query):
+    """Score word against a lowercase query, or None if it is not a subsequence.
+
+    Characters matched at the start of the word or of a hump, and runs of
+    consecutive characters, score higher; gaps cost a little.
+    """
+    lower = word.lower()
+    humps = hump_positions(word)
+    hump_set = set(humps)
+    best = _alignment_score(lower, humps, hump_set, query, True)
+    greedy = _alignment_score(lower, humps, hump_set, query, False)
+    if best is None or (greedy is not None and greedy > best):
+        best = greedy
+    if best is None:
+        return None
+    return best / len(query)
+
+
+def _subsequence_pattern(query):
+    # [^c]*c per character never backtracks, so filtering stays linear.
+    return re.compile("".join(f"[^{re.escape(ch)}]*{re.escape(ch)}" for ch in query))
+
+
+def fuzzy_scores(query, candidates):
+    """Score a short candidate list in one pass, without any indexing."""
+    query = query.lower()
+    if not query:
+        return {}
+    match = _subsequence_pattern(query).match
+    return {word: fuzzy_score(word, query) for word in candidates if match(word.lower())}
+
+
+class _Search:
+    """Progress of one query: survivors found in bucket[:stop], the scan
+    ending at end, and how many of them were scored."""
+
+    def __init__(self, bucket, survivors, stop, scores):
+        self.bucket = bucket
+        self.survivors = survivors
+        self.stop = stop
+        self.end = min(len(bucket), stop + SCAN_LIMIT)
+        self.scored = 0
+        self.scores = scores
+
+
+class FuzzyMatcher:
+    """Batch subsequence matcher over a candidate list.
+
+    The first query letter or digit must start a hump of the word, so a query
+    only looks at the words with a hump starting with it. Those are filtered
+    with one compiled pattern, shortest first, up to SCAN_LIMIT words per
+    query, and the first MAX_SCORED survivors are scored. Words whose hump
+    initials start with the query ("gcv" for getCurrentValue and
+    get_current_value) are found with a bisect in a sorted index and scored
+    first, as they usually rank best, however far the scan got.
+
+    With a deadline, match() stops once it passes and returns what it found
+    so far; calling it again with the same query resumes the search. A
+    query that extends a previous one re-filters that query's survivors and
+    scans on from where it stopped, and backspacing returns the cached
+    result.
+    """
+
+    def __init__(self, score_limit=FUZZY_SCORE_LIMIT):
+        self.score_limit = score_limit
+        self._source = None
+        self._buckets = {}
+        self._word_by_lower = {}
+        self._variants = {}
+        self._initials_keys = []
+        self._initials_words = []
+        self._searches = {}
+
+    def prepare(self, candidates):
+        """Index candidates now rather than on the first match() with them."""
+        if candidates is not self._source:
+            self._set_source(candidates)
+
+    def _set_source(self, candidates):
+        words = sorted(candidates, key=len)
+        joined = "\n".join(words)
+        lowered = joined.lower().split("\n")
+        initials = "".join(_INITIAL_PATTERN.findall(joined)).lower().split("\n")
+        order = sorted(range(len(words)), key=initials.__getitem__)
+        buckets = {}
+        for lower, word_initials in zip(lowered, initials):
+            for ch in set(word_initials):
+                bucket = buckets.get(ch)
+                if bucket is None:
+                    bucket = buckets[ch] = []
+                bucket.append(lower)
+        word_by_lower = dict(zip(lowered, words))
+        variants = {}
+        if len(word_by_lower) < len(words):
+            # Case variants such as Foo/foo share a lowercase form.
+            shared = {lower for lower, count in Counter(lowered).items() if count > 1}
+            for lower, word in zip(lowered, words):
+                if lower in shared:
+                    variants.setdefault(lower, []).append(word)
+            buckets = {ch: list(dict.fromkeys(bucket)) for ch, bucket in buckets.items()}
+        self._source = candidates
+        self._buckets = buckets
+        self._word_by_lower = word_by_lower
+        self._variants = variants
+        self._initials_keys = [initials[i] for i in order]
+        self._initials_words = [words[i] for i in order]
+        self._searches = {}
+
+    def _start(self, query, pattern):
+        first = next((ch for ch in query if ch.isalnum()), "")
+        bucket = self._buckets.get(first, [])
+        survivors = []
+        stop = 0
+        for length in range(len(query) - 1, 0, -1):
+            previous = self._searches.get(query[:length])
+            if previous is not None:
+                survivors = list(filter(pattern.match, previous.survivors))
+                stop = previous.stop
+                break
+        scores = {}
+        lo = bisect_left(self._initials_keys, query)
+        hi = bisect_left(self._initials_keys, query + "\U0010ffff", lo)
+        for word in self._initials_words[lo:min(hi, lo + self.score_limit)]:
+            score = fuzzy_score(word, query)
+            if score is not None:
+                scores[word] = score
+        return _Search(bucket, survivors, stop, scores)
+
+    def _advance(self, search, query, pattern, deadline):
+        while True:
+            to_score = min(len(search.survivors), MAX_SCORED)
+            if search.scored < to_score:
+                end = min(search.scored + SCORE_CHUNK, to_score)
+                self._score(search, query, search.survivors[search.scored:end])
+                search.scored = end
+            elif search.stop < search.end:
+                chunk = search.bucket[search.stop:min(search.stop + SCAN_CHUNK, search.end)]
+                search.survivors.extend(filter(pattern.match, chunk))
+                search.stop += len(chunk)
+            else:
+                return True
+            if deadline is not None and time.perf_counter() >= deadline:
+                return search.scored == min(len(search.survivors), MAX_SCORED) and search.stop == search.end
+
+    def _score(self, search, query, lowered):
+        scores = search.scores
+        variants = self._variants
+        for lower in lowered:
+            for word in variants.get(lower) or (self._word_by_lower[lower],):
+                if word not in scores:
+                    score = fuzzy_score(word, query)
+                    if score is not None:
+                        scores[word] = score
+
+    def match(self, query, candidates, deadline=None):
+        """Return ({word: score}, complete) for the best subsequence matches.
+
+        At most score_limit matches are returned. complete is False when the
+        search stopped at deadline (a time.perf_counter() value) before
+        its share of the candidates was checked. candidates is treated as
+        immutable: pass a new list when it changes.
+        """
+        query = query.lower()
+        if not query:
+            return {}, True
+        self.prepare(candidates)
+        pattern = _subsequence_pattern(query)
+        search = self._searches.get(query)
+        if search is None:
+            search = self._start(query, pattern)
+            if len(self._searches) >= MAX_CACHED_QUERIES:
+                self._searches.clear()
+            self._searches[query] = search
+        complete = self._advance(search, query, pattern, deadline)
+        scores = search.scores
+        if len(scores) > self.score_limit:
+            scores = dict(heapq.nlargest(self.score_limit, scores.items(), key=lambda item: item[1]))
+        return scores, complete
@@ -0,0 +1,96 @@
+import os
+import sqlite3
+
+
+SCHEMA_VERSION = 1
+
+
+def index_store_path(root_path):
+    return os.path.join(root_path, ".lcoder", "index.db")
+
+
+class IndexStore:
+    """SQLite copy of a WorkspaceIndex kept in <workspace>/.lcoder/index.db.
+
+    Rows hold the file's path relative to the workspace, language, mtime,
+    size, content hash and extracted symbols (newline separated). Each call
+    opens its own connection, so the store can be used from any thread.
+    """
+
+    def __init__(self, root_path):
+        self.root_path = root_path
+        self.path = index_store_path(root_path)
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10)
+        if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            conn.executescript(
+                """
+                DROP TABLE IF EXISTS files;
+                CREATE TABLE files (
+                    path TEXT PRIMARY KEY,
+                    language_id TEXT NOT NULL,
+                    mtime REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    hash TEXT NOT NULL,
+                    identifiers TEXT NOT NULL,
+                    definitions TEXT NOT NULL
+                );
+                """
+            )
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.commit()
+        return conn
+
+    def load(self):
+        """Return {abs_path: (language_id, mtime, size, hash, identifiers, definitions)}."""
+        if not os.path.exists(self.path):
+            return {}
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT path, language_id, mtime, size, hash, identifiers, definitions FROM files"
+            ).fetchall()
+        finally:
+            conn.close()
+        prefix = os.path.join(self.root_path, "")
+        return {
+            prefix + path: (
+                language_id,
+                mtime,
+                size,
+                digest,
+                tuple(identifiers.split("\n")) if identifiers else (),
+                tuple(definitions.split("\n")) if definitions else (),
+            )
+            for path, language_id, mtime, size, digest, identifiers, definitions in rows
+        }
+
+    def save(self, entries, removed=()):
+        """Upsert {abs_path: entry} (as returned by load()) and delete removed paths."""
+        if not entries and not removed:
+            return
+        root_path = self.root_path
+        rows = [
+            (
+                os.path.relpath(path, root_path),
+                language_id,
+                mtime,
+                size,
+                digest,
+                "\n".join(identifiers),
+                "\n".join(definitions),
+            )
+            for path, (language_id, mtime, size, digest, identifiers, definitions) in entries.items()
+        ]
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "DELETE FROM files WHERE path = ?",
+                    [(os.path.relpath(path, root_path),) for path in removed],
+                )
+                conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        finally:
+            conn.close()
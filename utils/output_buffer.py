@@ -0,0 +1,63 @@
+import threading
+
+
+# Interval between two flushes of buffered output into the GUI.
+FLUSH_INTERVAL_MS = 33
+# Characters buffered before writers from worker threads wait for a flush.
+MAX_PENDING_CHARS = 256 * 1024
+
+
+class OutputBuffer:
+    """Collect output written from any thread until the GUI drains it.
+
+    on_ready() is called on the writing thread when the buffer goes from
+    empty to non-empty, so the GUI is woken once per flush instead of once
+    per write. Each write names the channel (pane) it belongs to, None
+    being the shared output; drain() joins consecutive writes of the same
+    channel. Writers other than the main thread block while more than
+    max_pending characters are waiting, which slows a process flooding its
+    pipe down to the rate the widget can take. After close() writes are
+    dropped and blocked writers are released.
+    """
+
+    def __init__(self, on_ready=None, max_pending=MAX_PENDING_CHARS):
+        self.on_ready = on_ready
+        self.max_pending = max_pending
+        self._cond = threading.Condition()
+        self._parts = []
+        self._size = 0
+        self._closed = False
+
+    def write(self, text, channel=None):
+        if not text:
+            return
+        blocking = threading.current_thread() is not threading.main_thread()
+        with self._cond:
+            while blocking and self._size >= self.max_pending and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                return
+            was_empty = not self._parts
+            if self._parts and self._parts[-1][0] == channel:
+                self._parts[-1][1].append(text)
+            else:
+                self._parts.append((channel, [text]))
+            self._size += len(text)
+        if was_empty and self.on_ready:
+            self.on_ready()
+
+    def drain(self):
+        """Return [(channel, text)] written since the last drain, in order."""
+        with self._cond:
+            parts = self._parts
+            self._parts = []
+            self._size = 0
+            self._cond.notify_all()
+        return [(channel, "".join(texts)) for channel, texts in parts]
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._parts = []
+            self._size = 0
+            self._cond.notify_all()
@@ -0,0 +1,57 @@
+import os
+import tempfile
+
+
+# A log larger than this is moved to <path>.1 and started over.
+LOG_MAX_BYTES = 32 * 1024 * 1024
+
+
+def output_log_path(root_path, name):
+    """Log file of an output pane: under .lcoder/logs of the workspace, or the temp dir."""
+    folder = os.path.join(root_path, ".lcoder", "logs") if root_path else os.path.join(tempfile.gettempdir(), "lcoder-logs")
+    return os.path.join(folder, f"{name}.log")
+
+
+class OutputLog:
+    """Append-only copy of everything written to an output pane.
+
+    Panes keep a bounded number of lines; the log keeps the rest on disk so
+    it can be opened in an editor tab and searched. The disk use is bounded
+    too: past max_bytes the log is rotated to <path>.1, keeping one
+    previous generation.
+    """
+
+    def __init__(self, path, max_bytes=LOG_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._file = None
+        self._size = 0
+
+    def write(self, text):
+        if self._file is None:
+            self._open("a")
+        data = text.encode("utf-8", "replace")
+        if self._size and self._size + len(data) > self.max_bytes:
+            self._file.close()
+            os.replace(self.path, self.path + ".1")
+            self._open("w")
+        self._file.write(data)
+        self._size += len(data)
+
+    def clear(self):
+        self.close()
+        self._open("w")
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _open(self, mode):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._file = open(self.path, mode + "b")
+        self._size = self._file.seek(0, os.SEEK_END)
@@ -1,90 +1,162 @@
+import itertools
 import subprocess
-import threading
 import os
+import re
+import shlex
 import shutil
 from core.languages import LANGUAGES, encontrar_executavel
+from utils.cpp_build import CppBuild, cpp_cache_dir
+from utils.process_stream import LineMerger, start_pipe_reader
+from utils.python_pool import ForkServerPool, fork_server_supported
+from utils.pty_terminal import DEFAULT_COLUMNS, DEFAULT_ROWS, PipeSession, PtySession, pty_supported
+from utils.run_scheduler import RunScheduler, process_group_options
 
 class ProcessManager:
-    def __init__(self, output_callback):
+    def __init__(self, output_callback, on_run_changed=None, max_concurrent_runs=2):
+        # output_callback(text, channel=None); runs write to channel run.id.
         self.output_callback = output_callback
-        self.terminal_process = None
+        # Terminal sessions by id; they write to channel ("terminal", id).
+        self.terminals = {}
+        self._terminal_ids = itertools.count(1)
+        self.scheduler = RunScheduler(max_concurrent_runs, on_run_changed)
+        # Interpretadores Python ja aquecidos, por venv (opcional).
+        self.python_pool = ForkServerPool(self.output_callback)
 
     def run_code(self, language, file_path, config_manager):
         lang_config = LANGUAGES.get(language)
         if not lang_config:
             self.output_callback(f"Erro: Configuracao para '{language}' nao encontrada.\n")
-            return
+            return None
 
-        # Tenta obter o executavel configurado ou encontrar no PATH
-        executable = config_manager.get("languages", language, "path")
-        if not executable or not os.path.exists(executable):
-            executable = encontrar_executavel(lang_config["executable"])
-            # Fallback final usando shutil.which
-            if not os.path.exists(executable):
-                executable = shutil.which(lang_config["executable"]) or lang_config["executable"]
-        if language == "python":
-            venv_executable = self._resolve_venv_python(file_path, config_manager)
-            if venv_executable:
-                executable = venv_executable
+        executable = self._resolve_executable(language, file_path, config_manager)
+        timestamps = bool(config_manager.get("output", "timestamps"))
+        root_path = config_manager.get("workspace", "root_path") or ""
 
-        def run():
+        def run(run_info):
+            write = lambda text: self.output_callback(text, run_info.id)
+            returncode = None
             try:
-                self.output_callback(f"--- Executando {os.path.basename(file_path)} ---\n")
+                write(f"--- Executando {os.path.basename(file_path)} ---\n")
                 if language == "cpp":
                     base, _ = os.path.splitext(file_path)
                     output_path = f"{base}.exe" if os.name == "nt" else f"{base}.out"
-                    compile_args = [executable, file_path, "-o", output_path]
-
-                    compile_proc = subprocess.Popen(
-                        compile_args,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE,
-                        text=True,
-                        creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0,
+                    # Objetos sem mudanca vem do cache; os demais compilam em paralelo.
+                    build = CppBuild(
+                        executable,
+                        shlex.split(config_manager.get("languages", "cpp", "flags") or "", posix=os.name != "nt"),
+                        cpp_cache_dir(root_path, file_path),
+                        write=write,
+                        on_process=lambda process: self.scheduler.attach(run_info, process),
+                        should_stop=lambda: run_info.stop_requested,
                     )
-                    c_stdout, c_stderr = compile_proc.communicate()
-                    if c_stdout:
-                        self.output_callback(c_stdout)
-                    if c_stderr:
-                        self.output_callback(c_stderr)
-
-                    if compile_proc.returncode != 0:
-                        self.output_callback(f"\n--- Compila????o falhou com codigo {compile_proc.returncode} ---\n")
-                        return
+                    compile_code = build.build(file_path, output_path)
+                    if run_info.stop_requested:
+                        write("\n--- Processo interrompido ---\n")
+                        return compile_code
+                    if compile_code != 0:
+                        write(f"\n--- Compila????o falhou com codigo {compile_code} ---\n")
+                        return compile_code
 
                     run_args = [output_path] if os.name == "nt" else ["./" + os.path.basename(output_path)]
                     run_cwd = os.path.dirname(output_path) or None
-                    process = subprocess.Popen(
-                        run_args,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE,
-                        text=True,
-                        cwd=run_cwd,
-                        creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0,
-                    )
+                    returncode = self._stream_process(run_info, run_args, write, cwd=run_cwd, timestamps=timestamps)
                 else:
                     # Prepara os argumentos substituindo o placeholder {file}
                     args = [executable] + [arg.replace("{file}", file_path) for arg in lang_config["run_args"]]
-                    process = subprocess.Popen(
-                        args,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE,
-                        text=True,
-                        creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0,
-                    )
+                    env = None
+                    unbuffered = language == "python" and config_manager.get("python", "unbuffered_run") is not False
+                    if unbuffered:
+                        # Sem buffer, para a saida aparecer enquanto o script roda.
+                        args.insert(1, "-u")
+                        env = dict(os.environ, PYTHONUNBUFFERED="1")
+                    process = None
+                    if language == "python" and config_manager.get("python", "fork_server"):
+                        process = self._fork_python(executable, file_path, unbuffered, config_manager)
+                    if process is not None:
+                        self.scheduler.attach(run_info, process)
+                        returncode = self._follow_process(process, write, timestamps)
+                    else:
+                        returncode = self._stream_process(run_info, args, write, env=env, timestamps=timestamps)
 
-                stdout, stderr = process.communicate()
-
-                if stdout:
-                    self.output_callback(stdout)
-                if stderr:
-                    self.output_callback(stderr)
-
-                self.output_callback(f"\n--- Processo finalizado com codigo {process.returncode} ---\n")
+                if run_info.stop_requested:
+                    write(f"\n--- Processo interrompido (codigo {returncode}) ---\n")
+                else:
+                    write(f"\n--- Processo finalizado com codigo {returncode} ---\n")
             except Exception as e:
-                self.output_callback(f"Erro ao executar processo: {e}\n")
+                write(f"Erro ao executar processo: {e}\n")
+            return returncode
 
-        threading.Thread(target=run, daemon=True).start()
+        return self.scheduler.submit(os.path.basename(file_path), run)
+
+    def stop_run(self, run_id, kill=False):
+        return self.scheduler.stop(run_id, kill)
+
+    def _resolve_executable(self, language, file_path, config_manager):
+        lang_config = LANGUAGES[language]
+        # Tenta obter o executavel configurado ou encontrar no PATH
+        executable = config_manager.get("languages", language, "path")
+        if not executable or not os.path.exists(executable):
+            executable = encontrar_executavel(lang_config["executable"])
+            # Fallback final usando shutil.which
+            if not os.path.exists(executable):
+                executable = shutil.which(lang_config["executable"]) or lang_config["executable"]
+        if language == "python":
+            venv_executable = self._resolve_venv_python(file_path, config_manager)
+            if venv_executable:
+                executable = venv_executable
+        return executable
+
+    def _fork_server(self, executable, config_manager):
+        if not fork_server_supported():
+            return None
+        modules = re.split(r"[\s,]+", config_manager.get("python", "preload_modules") or "")
+        root_path = config_manager.get("workspace", "root_path") or None
+        return self.python_pool.get(executable, [name for name in modules if name], root_path)
+
+    def prewarm_python(self, config_manager):
+        """Start the fork server of the workspace interpreter ahead of the first Run."""
+        if not config_manager.get("python", "fork_server"):
+            return
+        root_path = config_manager.get("workspace", "root_path") or ""
+        file_path = os.path.join(root_path, "main.py") if root_path else ""
+        self._fork_server(self._resolve_executable("python", file_path, config_manager), config_manager)
+
+    def refresh_python_pool(self, config_manager):
+        """Restart fork servers whose preloaded workspace modules were edited."""
+        if self.python_pool.discard_stale():
+            self.prewarm_python(config_manager)
+
+    def _fork_python(self, executable, file_path, unbuffered, config_manager):
+        # Enquanto o servidor aquece, o Run segue pelo caminho normal.
+        server = self._fork_server(executable, config_manager)
+        if server is None or not server.ready:
+            return None
+        return server.run(file_path, env={"PYTHONUNBUFFERED": "1"} if unbuffered else None, unbuffered=unbuffered)
+
+    def _stream_process(self, run_info, args, write, cwd=None, env=None, timestamps=False):
+        process = subprocess.Popen(
+            args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=cwd,
+            env=env,
+            **process_group_options(),
+        )
+        self.scheduler.attach(run_info, process)
+        return self._follow_process(process, write, timestamps)
+
+    def _follow_process(self, process, write, timestamps=False):
+        # One reader per pipe: stdout and stderr reach the output line by
+        # line in the order they are read, without waiting for the exit.
+        merger = LineMerger(write, timestamps)
+        readers = [
+            start_pipe_reader(process.stdout, merger.stream("stdout")),
+            start_pipe_reader(process.stderr, merger.stream("stderr")),
+        ]
+        for reader in readers:
+            reader.join()
+        merger.flush()
+        return process.wait()
 
     def _resolve_venv_python(self, file_path, config_manager):
         cfg = config_manager.get("venv") or {}
@@ -114,64 +186,75 @@ class ProcessManager:
         if os.name == "nt":
             return os.path.join(venv_path, "Scripts", "python.exe")
         return os.path.join(venv_path, "bin", "python")
-    def start_terminal(self, language, config_manager):
-        if self.terminal_process:
-            self.stop_terminal()
+    def start_terminal(self, language, config_manager, columns=DEFAULT_COLUMNS, rows=DEFAULT_ROWS):
+        """Start a new terminal session; returns its id, or None on failure.
 
-        lang_config = LANGUAGES.get(language)
-        executable = config_manager.get("languages", language, "path")
-        if not executable or not os.path.exists(executable):
-            executable = encontrar_executavel(lang_config["executable"])
-            if not os.path.exists(executable):
-                executable = shutil.which(lang_config["executable"]) or lang_config["executable"]
+        Each session writes to the output channel ("terminal", id). PTY
+        sessions all share one selector loop.
+        """
+        lang_config = LANGUAGES.get(language) or LANGUAGES["python"]
+        session_id = next(self._terminal_ids)
+        write = lambda text: self.output_callback(text, ("terminal", session_id))
 
         try:
             if os.name == 'nt':
                 args = ["cmd.exe"]
             else:
                 args = ["/bin/bash"]
-            
-            self.terminal_process = subprocess.Popen(
-                args, 
-                stdin=subprocess.PIPE, 
-                stdout=subprocess.PIPE, 
-                stderr=subprocess.STDOUT, 
-                text=True, 
-                bufsize=1,
-                creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0,
-                env=os.environ
-            )
-            
-            def listen():
-                try:
-                    for line in iter(self.terminal_process.stdout.readline, ''):
-                        if not line: break
-                        self.output_callback(line)
-                except:
-                    pass
-                finally:
-                    self.terminal_process = None
 
-            threading.Thread(target=listen, daemon=True).start()
-            self.output_callback(f"Terminal {lang_config['name']} iniciado.\n")
+            if pty_supported() and config_manager.get("terminal", "use_pty") is not False:
+                # Terminal real: prompts, saida sem buffer e tamanho da janela.
+                session_class = PtySession
+            else:
+                session_class = PipeSession
+            session = session_class(
+                args,
+                write,
+                lambda returncode: self._on_terminal_exit(session_id, returncode),
+                env=os.environ,
+                columns=columns,
+                rows=rows,
+            )
+            self.terminals[session_id] = session
+            session.start()
+            write(f"Terminal {lang_config['name']} iniciado.\n")
+            return session_id
         except Exception as e:
-            self.output_callback(f"Erro ao iniciar terminal: {e}\n")
+            self.terminals.pop(session_id, None)
+            write(f"Erro ao iniciar terminal: {e}\n")
+            return None
 
-    def send_terminal_command(self, command):
-        if self.terminal_process and self.terminal_process.stdin:
-            try:
-                self.terminal_process.stdin.write(command + "\n")
-                self.terminal_process.stdin.flush()
-            except Exception as e:
-                self.output_callback(f"Erro ao enviar comando: {e}\n")
-        else:
-            self.output_callback("Terminal não está em execução.\n")
+    def is_terminal_running(self, session_id):
+        return session_id in self.terminals
+
+    def _on_terminal_exit(self, session_id, returncode):
+        if self.terminals.pop(session_id, None) is not None:
+            self.output_callback(f"\nTerminal finalizado com codigo {returncode}.\n", ("terminal", session_id))
+
+    def resize_terminal(self, session_id, columns, rows):
+        session = self.terminals.get(session_id)
+        if session is not None:
+            session.resize(columns, rows)
+
+    def send_terminal_command(self, session_id, command):
+        session = self.terminals.get(session_id)
+        if session is None:
+            self.output_callback("Terminal não está em execução.\n", ("terminal", session_id))
+            return
+        try:
+            session.write(command + "\n")
+        except Exception as e:
+            self.output_callback(f"Erro ao enviar comando: {e}\n", ("terminal", session_id))
 
-    def stop_terminal(self):
-        if self.terminal_process:
+    def stop_terminal(self, session_id=None):
+        """Stop one terminal session, or all of them when session_id is None."""
+        session_ids = list(self.terminals) if session_id is None else [session_id]
+        for key in session_ids:
+            session = self.terminals.pop(key, None)
+            if session is None:
+                continue
             try:
-                self.terminal_process.terminate()
-            except:
+                session.terminate()
+            except Exception:
                 pass
-            self.terminal_process = None
-            self.output_callback("Terminal parado.\n")
+            self.output_callback("Terminal parado.\n", ("terminal", key))
@@ -0,0 +1,117 @@
+import codecs
+import locale
+import os
+import threading
+import time
+
+
+READ_SIZE = 64 * 1024
+# How long an unterminated line (a prompt, a progress bar) is held back
+# waiting for its newline before it is shown anyway.
+PARTIAL_LINE_DELAY = 0.05
+
+
+def timestamp_prefix(now=None):
+    now = time.time() if now is None else now
+    return time.strftime("[%H:%M:%S", time.localtime(now)) + f".{int(now % 1 * 1000):03d}] "
+
+
+class LineMerger:
+    """Merge the text of several streams into write() one line at a time.
+
+    Each reader passes its text to the function returned by stream(); whole
+    lines are written at once, so lines of stdout and stderr never mix. A
+    trailing partial line is written after PARTIAL_LINE_DELAY if its
+    newline has not arrived by then. With timestamps, every line is
+    prefixed with the time its first part was written.
+    """
+
+    def __init__(self, write, timestamps=False, delay=PARTIAL_LINE_DELAY):
+        self._write = write
+        self._timestamps = timestamps
+        self._delay = delay
+        self._lock = threading.Lock()
+        self._partial = {}
+        self._at_line_start = {}
+        self._timer = None
+
+    def stream(self, key):
+        self._partial[key] = ""
+        self._at_line_start[key] = True
+        return lambda text: self._feed(key, text)
+
+    def flush(self):
+        with self._lock:
+            self._timer = None
+            for key, text in self._partial.items():
+                if text:
+                    self._partial[key] = ""
+                    self._emit(key, text)
+
+    def _feed(self, key, text):
+        with self._lock:
+            text = self._partial[key] + text
+            cut = text.rfind("\n") + 1
+            complete, rest = text[:cut], text[cut:]
+            self._partial[key] = rest
+            if complete:
+                self._emit(key, complete)
+            if rest and self._timer is None:
+                self._timer = threading.Timer(self._delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _emit(self, key, text):
+        if self._timestamps:
+            stamp = timestamp_prefix()
+            stamped = text.replace("\n", "\n" + stamp)
+            if self._at_line_start[key]:
+                stamped = stamp + stamped
+            if text.endswith("\n"):
+                stamped = stamped[: -len(stamp)]
+            self._at_line_start[key] = text.endswith("\n")
+            text = stamped
+        self._write(text)
+
+
+def _read_pipe(pipe, write, encoding, on_close):
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    fd = pipe.fileno()
+    pending_cr = False
+    try:
+        while True:
+            # os.read returns as soon as anything is available, so output
+            # without a trailing newline (prompts, progress) shows up too.
+            data = os.read(fd, READ_SIZE)
+            text = decoder.decode(data, final=not data)
+            if pending_cr and not text.startswith("\n"):
+                text = "\n" + text
+            pending_cr = text.endswith("\r")
+            if pending_cr:
+                text = text[:-1]
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+            if text:
+                write(text)
+            if not data:
+                break
+    except OSError:
+        pass
+    finally:
+        pipe.close()
+        if on_close:
+            on_close()
+
+
+def start_pipe_reader(pipe, write, encoding=None, on_close=None):
+    """Forward a binary pipe to write(text) on a daemon thread until EOF.
+
+    Text is passed on chunk by chunk as it arrives, with line endings
+    normalized to "\\n"; nothing is accumulated, so a process writing
+    faster than write() returns is held back by the full pipe. on_close()
+    is called on the thread at EOF. Returns the thread, to be joined before
+    the process's exit is reported.
+    """
+    encoding = encoding or locale.getpreferredencoding(False)
+    thread = threading.Thread(target=_read_pipe, args=(pipe, write, encoding, on_close), daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,337 @@
+import codecs
+import errno
+import os
+import re
+import selectors
+import shutil
+import signal
+import struct
+import subprocess
+import sys
+import threading
+
+from utils.process_stream import start_pipe_reader
+
+try:
+    import fcntl
+    import pty
+    import termios
+except ImportError:  # Windows
+    pty = None
+
+
+READ_SIZE = 64 * 1024
+DEFAULT_COLUMNS = 120
+DEFAULT_ROWS = 40
+
+# CSI and OSC sequences, then any other two-byte escape.
+_ESCAPE_RE = re.compile(r"\x1b\[[0-?]*[ -/]*[@-~]|\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)|\x1b[@-Z\\-_]")
+# "\r" before a newline, or at the start of a line, does not move the cursor.
+_CR_BEFORE_NEWLINE_RE = re.compile(r"\r+\n")
+_CR_AFTER_NEWLINE_RE = re.compile(r"\n\r+")
+# An escape sequence cut by the end of a read.
+_PARTIAL_ESCAPE_RE = re.compile(r"\x1b(?:\[[0-?]*[ -/]*|\][^\x07\x1b]*\x1b?)?$")
+
+
+def pty_supported():
+    return pty is not None
+
+
+class TerminalTextFilter:
+    """Turn raw terminal output into text an OutputView can show.
+
+    Escape sequences (colors, cursor movement, bracketed paste) are
+    dropped, "\\r\\n" and lone "\\r" become "\\n", and backspaces and bells
+    are removed. Sequences split between two reads are held until complete.
+    """
+
+    def __init__(self, encoding="utf-8"):
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        self._pending = ""
+        self._line_start = True
+
+    def feed(self, data, final=False):
+        text = self._pending + self._decoder.decode(data, final=final)
+        self._pending = ""
+        if not final:
+            start = text.rfind("\x1b")
+            if start != -1 and _PARTIAL_ESCAPE_RE.match(text, start):
+                text, self._pending = text[:start], text[start:]
+            stripped = text.rstrip("\r")
+            if len(stripped) < len(text):
+                text, self._pending = stripped, text[len(stripped):] + self._pending
+        if "\x1b" in text:
+            text = _ESCAPE_RE.sub("", text)
+        text = text.replace("\r\n", "\n")
+        if "\r" in text:
+            text = _CR_BEFORE_NEWLINE_RE.sub("\n", text)
+            if self._line_start:
+                text = text.lstrip("\r")
+            text = _CR_AFTER_NEWLINE_RE.sub("\n", text).replace("\r", "\n")
+        if "\x08" in text or "\x07" in text:
+            text = text.replace("\x08", "").replace("\x07", "")
+        if text:
+            self._line_start = text.endswith("\n")
+        return text
+
+
+class PtyLoop:
+    """One selector thread reading every PtySession.
+
+    Masters are non-blocking and read in READ_SIZE chunks as soon as the
+    selector reports them readable. Sessions are registered through a
+    wake-up pipe, so the loop never needs a timeout.
+    """
+
+    def __init__(self):
+        self._selector = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self._calls = []
+        self._thread = None
+        self._wake_read, self._wake_write = os.pipe()
+        os.set_blocking(self._wake_read, False)
+        os.set_blocking(self._wake_write, False)
+        self._selector.register(self._wake_read, selectors.EVENT_READ, None)
+
+    def add(self, session):
+        self._call(lambda: self._selector.register(session.fd, selectors.EVENT_READ, session))
+
+    def _call(self, func):
+        with self._lock:
+            self._calls.append(func)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="pty-loop", daemon=True)
+                self._thread.start()
+        try:
+            os.write(self._wake_write, b"\0")
+        except BlockingIOError:
+            pass
+
+    def _run(self):
+        while True:
+            for key, _events in self._selector.select():
+                session = key.data
+                if session is None:
+                    self._run_calls()
+                    continue
+                try:
+                    data = os.read(key.fd, READ_SIZE)
+                except BlockingIOError:
+                    continue
+                except OSError:
+                    # EIO: every process holding the slave side has exited.
+                    data = b""
+                if data:
+                    session._received(data)
+                else:
+                    self._selector.unregister(key.fd)
+                    session._closed()
+
+    def _run_calls(self):
+        try:
+            while os.read(self._wake_read, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        with self._lock:
+            calls, self._calls = self._calls, []
+        for func in calls:
+            try:
+                func()
+            except Exception as exc:
+                print(f"[pty] {exc}")
+
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def shared_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = PtyLoop()
+        return _loop
+
+
+def _set_window_size(fd, columns, rows):
+    fcntl.ioctl(fd, termios.TIOCSWINSZ, struct.pack("HHHH", rows, columns, 0, 0))
+
+
+# Frozen builds have no "python -c"; they run the helper as "app FLAG ...".
+LOGIN_TTY_FLAG = "--lcoder-login-tty"
+# login_tty_main() for "python -c", which cannot import this package.
+_LOGIN_TTY_SOURCE = (
+    "import fcntl, os, signal, sys, termios\n"
+    "fcntl.ioctl(0, termios.TIOCSCTTY, 0)\n"
+    "signal.signal(signal.SIGPIPE, signal.SIG_DFL)\n"
+    "signal.signal(signal.SIGXFSZ, signal.SIG_DFL)\n"
+    "os.execv(sys.argv[1], sys.argv[2:])\n"
+)
+
+
+def login_tty_main(argv):
+    """The helper run between Popen and the program: take the PTY on stdin as
+    controlling terminal and exec argv, [executable, arg0, arg1, ...]."""
+    fcntl.ioctl(0, termios.TIOCSCTTY, 0)
+    # Python ignores these at startup, and exec would keep them ignored.
+    signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+    signal.signal(signal.SIGXFSZ, signal.SIG_DFL)
+    os.execv(argv[0], argv[1:])
+
+
+def _login_tty_command(executable, args):
+    if getattr(sys, "frozen", False):
+        return [sys.executable, LOGIN_TTY_FLAG, executable] + list(args)
+    return [sys.executable, "-I", "-S", "-c", _LOGIN_TTY_SOURCE, executable] + list(args)
+
+
+def _report_exit(process, on_exit):
+    # A process may close its terminal a moment before it exits; waiting
+    # for it here would hold up the caller (the loop of every terminal).
+    def report():
+        returncode = process.wait()
+        if on_exit:
+            on_exit(returncode)
+
+    if process.poll() is not None:
+        report()
+    else:
+        threading.Thread(target=report, name="terminal-exit", daemon=True).start()
+
+
+class PtySession:
+    """A process attached to a pseudo-terminal, read by a PtyLoop.
+
+    The child is a session leader with the PTY as its controlling terminal,
+    so it line-buffers its output, shows prompts and receives SIGWINCH on
+    resize() like in a real terminal. on_output(text) gets the filtered
+    output on the loop thread, and on_exit(returncode) is called once the
+    terminal closed and the process exited, on the loop thread or on a
+    thread of its own if the process was still exiting.
+    """
+
+    def __init__(self, args, on_output, on_exit=None, cwd=None, env=None, columns=DEFAULT_COLUMNS, rows=DEFAULT_ROWS):
+        self.args = args
+        self.on_output = on_output
+        self.on_exit = on_exit
+        self.cwd = cwd
+        self.env = dict(os.environ if env is None else env)
+        # Programs keep their output free of colors and cursor control.
+        self.env.setdefault("TERM", "dumb")
+        self.columns = columns
+        self.rows = rows
+        self.fd = None
+        self.process = None
+        self._filter = TerminalTextFilter()
+
+    def start(self, loop=None):
+        executable = shutil.which(self.args[0], path=self.env.get("PATH"))
+        if executable is None:
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), self.args[0])
+        master, slave = pty.openpty()
+        try:
+            _set_window_size(master, self.columns, self.rows)
+            # Popen forks and sets up the new session in C, without running
+            # Python in the child; the helper then takes the PTY on its stdin
+            # as controlling terminal and execs the program.
+            self.process = subprocess.Popen(
+                _login_tty_command(executable, self.args),
+                stdin=slave,
+                stdout=slave,
+                stderr=slave,
+                cwd=self.cwd,
+                env=self.env,
+                start_new_session=True,
+            )
+        except BaseException:
+            os.close(master)
+            raise
+        finally:
+            os.close(slave)
+        os.set_blocking(master, False)
+        self.fd = master
+        (loop or shared_loop()).add(self)
+
+    def write(self, text):
+        data = text.encode("utf-8")
+        while data:
+            try:
+                written = os.write(self.fd, data)
+            except BlockingIOError:
+                threading.Event().wait(0.01)
+                continue
+            data = data[written:]
+
+    def resize(self, columns, rows):
+        if (columns, rows) == (self.columns, self.rows):
+            return
+        self.columns, self.rows = columns, rows
+        if self.fd is not None:
+            try:
+                _set_window_size(self.fd, columns, rows)
+            except OSError:
+                pass
+
+    def terminate(self):
+        # Like closing a terminal window: the shell and its jobs get SIGHUP.
+        if self.process is not None and self.process.poll() is None:
+            try:
+                os.killpg(self.process.pid, signal.SIGHUP)
+            except (OSError, ProcessLookupError):
+                pass
+
+    def _received(self, data):
+        text = self._filter.feed(data)
+        if text:
+            self.on_output(text)
+
+    def _closed(self):
+        text = self._filter.feed(b"", final=True)
+        if text:
+            self.on_output(text)
+        os.close(self.fd)
+        self.fd = None
+        _report_exit(self.process, self.on_exit)
+
+
+class PipeSession:
+    """Fallback for PtySession where there is no PTY (Windows), on plain pipes.
+
+    Output is forwarded by one reader thread per session, as pipes cannot be
+    waited on with a selector there. resize() has no effect.
+    """
+
+    def __init__(self, args, on_output, on_exit=None, cwd=None, env=None, columns=DEFAULT_COLUMNS, rows=DEFAULT_ROWS):
+        self.args = args
+        self.on_output = on_output
+        self.on_exit = on_exit
+        self.cwd = cwd
+        self.env = env
+        self.process = None
+
+    def start(self, loop=None):
+        self.process = subprocess.Popen(
+            self.args,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            cwd=self.cwd,
+            env=self.env,
+            creationflags=subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0,
+        )
+        start_pipe_reader(self.process.stdout, self.on_output, on_close=self._closed)
+
+    def write(self, text):
+        self.process.stdin.write(text.encode("utf-8"))
+        self.process.stdin.flush()
+
+    def resize(self, columns, rows):
+        pass
+
+    def terminate(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+
+    def _closed(self):
+        _report_exit(self.process, self.on_exit)
@@ -0,0 +1,199 @@
+import json
+import os
+import socket
+import subprocess
+import tempfile
+import threading
+
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fork_server.py")
+
+
+def fork_server_supported():
+    return os.name == "posix" and hasattr(socket, "send_fds") and os.path.exists(SERVER_SCRIPT)
+
+
+class ForkedProcess:
+    """Popen-like handle of a script run by a ForkServer.
+
+    The child leads a process group of its own, so it can be stopped with
+    terminate_process_group() like a Popen started in a new session.
+    """
+
+    def __init__(self, conn, reader, pid, stdout, stderr):
+        self._conn = conn
+        self._reader = reader
+        self.pid = pid
+        self.stdout = stdout
+        self.stderr = stderr
+        self.returncode = None
+
+    def poll(self):
+        return self.returncode
+
+    def wait(self):
+        if self.returncode is None:
+            try:
+                line = self._reader.readline()
+                self.returncode = json.loads(line)["exit"] if line else -1
+            except (OSError, ValueError, KeyError):
+                self.returncode = -1
+            self._reader.close()
+            self._conn.close()
+        return self.returncode
+
+
+class ForkServer:
+    """A fork_server.py process of one interpreter with modules imported.
+
+    start() launches it in the background; run() forks a child from it once
+    it has printed "ready" and returns a ForkedProcess, or None while the
+    server is still warming up or after it died. stale() tells when a
+    workspace module it imported was changed since.
+    """
+
+    def __init__(self, python, modules=(), cwd=None, log=None):
+        self.python = python
+        self.modules = tuple(modules)
+        self.cwd = cwd
+        self.log = log
+        self.process = None
+        self._folder = None
+        self._socket_path = None
+        self._ready = threading.Event()
+        self.workspace_files = {}
+
+    @property
+    def ready(self):
+        return self._ready.is_set() and self.process is not None and self.process.poll() is None
+
+    def start(self):
+        self._folder = tempfile.mkdtemp(prefix="lcoder-fork-")
+        self._socket_path = os.path.join(self._folder, "server.sock")
+        # stdin stays open for the server's lifetime; it exits at EOF.
+        self.process = subprocess.Popen(
+            [self.python, SERVER_SCRIPT, self._socket_path, ",".join(self.modules)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            cwd=self.cwd,
+            text=True,
+            start_new_session=True,
+        )
+        threading.Thread(target=self._listen, daemon=True).start()
+
+    def _listen(self):
+        for line in iter(self.process.stdout.readline, ""):
+            if line.strip() == "ready":
+                self._ready.set()
+            elif line.startswith("workspace-modules "):
+                try:
+                    self.workspace_files = json.loads(line.split(" ", 1)[1])
+                except ValueError:
+                    pass
+            elif self.log:
+                self.log(f"[fork-server] {line}")
+        self._ready.clear()
+        self.process.wait()
+        self._remove_socket()
+
+    def stale(self):
+        for path, mtime in self.workspace_files.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def run(self, script, cwd=None, env=None, unbuffered=True):
+        if not self.ready:
+            return None
+        stdout_read, stdout_write = os.pipe()
+        stderr_read, stderr_write = os.pipe()
+        stdin_fd = os.open(os.devnull, os.O_RDONLY)
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            conn.connect(self._socket_path)
+            request = {"script": script, "cwd": cwd or os.getcwd(), "env": env or {}, "unbuffered": unbuffered}
+            socket.send_fds(conn, [json.dumps(request).encode("utf-8")], [stdin_fd, stdout_write, stderr_write])
+            reader = conn.makefile("r", encoding="utf-8")
+            pid = json.loads(reader.readline())["pid"]
+        except (OSError, ValueError, KeyError) as exc:
+            conn.close()
+            os.close(stdout_read)
+            os.close(stderr_read)
+            if self.log:
+                self.log(f"[fork-server] {exc}\n")
+            return None
+        finally:
+            # The child has its own copies now; EOF on the pipes means it exited.
+            for fd in (stdin_fd, stdout_write, stderr_write):
+                os.close(fd)
+        return ForkedProcess(conn, reader, pid, os.fdopen(stdout_read, "rb", 0), os.fdopen(stderr_read, "rb", 0))
+
+    def close(self):
+        # The server exits once its running children have; _listen() then
+        # removes the socket folder.
+        self._ready.clear()
+        if self.process is not None and self.process.poll() is None:
+            try:
+                self.process.stdin.close()
+            except OSError:
+                pass
+        else:
+            self._remove_socket()
+
+    def _remove_socket(self):
+        if self._folder:
+            try:
+                if os.path.exists(self._socket_path):
+                    os.unlink(self._socket_path)
+                os.rmdir(self._folder)
+            except OSError:
+                pass
+
+
+class ForkServerPool:
+    """One ForkServer per interpreter, module list and folder, started on demand."""
+
+    def __init__(self, log=None):
+        self.log = log
+        self._servers = {}
+        self._lock = threading.Lock()
+
+    def get(self, python, modules=(), cwd=None):
+        """Server for python, starting it if needed; may not be ready yet."""
+        key = (python, tuple(modules), cwd)
+        with self._lock:
+            server = self._servers.get(key)
+            if server is not None and (server.process.poll() is not None or server.stale()):
+                server.close()
+                server = None
+            if server is None:
+                server = ForkServer(python, modules, cwd, self.log)
+                try:
+                    server.start()
+                except OSError as exc:
+                    if self.log:
+                        self.log(f"[fork-server] Could not start {python}: {exc}\n")
+                    return None
+                self._servers[key] = server
+            return server
+
+    def discard_stale(self):
+        """Close servers whose workspace modules changed; True if there were any."""
+        with self._lock:
+            stale = [key for key, server in self._servers.items() if server.stale()]
+            servers = [self._servers.pop(key) for key in stale]
+        for server in servers:
+            if self.log:
+                self.log("[fork-server] Workspace modules changed, restarting\n")
+            server.close()
+        return bool(servers)
+
+    def close(self):
+        with self._lock:
+            servers, self._servers = list(self._servers.values()), {}
+        for server in servers:
+            server.close()
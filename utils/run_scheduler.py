@@ -0,0 +1,182 @@
+import itertools
+import os
+import signal
+import subprocess
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+QUEUED = "queued"
+RUNNING = "running"
+FINISHED = "finished"
+STOPPED = "stopped"
+
+
+def process_group_options():
+    """Popen keyword arguments starting the child in a process group of its own."""
+    if os.name == "nt":
+        return {"creationflags": subprocess.CREATE_NO_WINDOW | subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+
+def terminate_process_group(process, kill=False):
+    """Terminate (or kill) process and every process it started in its group."""
+    if process.poll() is not None:
+        return
+    try:
+        if os.name == "nt":
+            # Console programs ignore a polite taskkill, so it is always forced.
+            subprocess.run(
+                ["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                creationflags=subprocess.CREATE_NO_WINDOW,
+            )
+        else:
+            os.killpg(process.pid, signal.SIGKILL if kill else signal.SIGTERM)
+    except (OSError, ProcessLookupError):
+        pass
+
+
+class Run:
+    def __init__(self, run_id, name, target):
+        self.id = run_id
+        self.name = name
+        self.target = target
+        self.state = QUEUED
+        self.returncode = None
+        self.error = None
+        self.processes = []
+        self.stop_requested = False
+        # Dropped from the scheduler as soon as it ends.
+        self.forgotten = False
+        self.started = None
+        self.ended = None
+
+    @property
+    def active(self):
+        return self.state in (QUEUED, RUNNING)
+
+
+class RunScheduler:
+    """Start runs on daemon threads, at most max_concurrent at a time.
+
+    submit(name, target) queues a Run and returns it; target(run) is called
+    on its own thread once a slot is free and returns the exit code. Targets
+    report the processes they start with attach(), so stop() can terminate
+    the process groups of a run at any point. on_change(run) is called
+    whenever a run changes state, from whichever thread changed it.
+    """
+
+    def __init__(self, max_concurrent=2, on_change=None):
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.on_change = on_change
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._runs = OrderedDict()
+        self._queue = deque()
+        self._running = 0
+
+    def submit(self, name, target):
+        run = Run(next(self._ids), name, target)
+        with self._lock:
+            self._runs[run.id] = run
+            self._queue.append(run)
+            started = self._start_ready()
+        self._notify([run] + [item for item in started if item is not run])
+        return run
+
+    def get(self, run_id):
+        with self._lock:
+            return self._runs.get(run_id)
+
+    def runs(self):
+        with self._lock:
+            return list(self._runs.values())
+
+    def attach(self, run, process):
+        with self._lock:
+            run.processes = [item for item in run.processes if item.poll() is None]
+            run.processes.append(process)
+            stop_requested = run.stop_requested
+        if stop_requested:
+            terminate_process_group(process, kill=True)
+
+    def stop(self, run_id, kill=False):
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is None or not run.active:
+                return False
+            run.stop_requested = True
+            processes = list(run.processes)
+            queued = run.state == QUEUED
+            if queued:
+                self._queue.remove(run)
+                run.state = STOPPED
+                run.ended = time.time()
+        if queued:
+            self._notify([run])
+        for process in processes:
+            terminate_process_group(process, kill)
+        return True
+
+    def stop_all(self, kill=False):
+        for run in self.runs():
+            self.stop(run.id, kill)
+
+    def forget(self, run_id):
+        """Drop a run; an active one is dropped once it ends."""
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is None:
+                return
+            if run.active:
+                run.forgotten = True
+            else:
+                del self._runs[run_id]
+
+    def set_max_concurrent(self, max_concurrent):
+        with self._lock:
+            self.max_concurrent = max(1, int(max_concurrent))
+            started = self._start_ready()
+        self._notify(started)
+
+    def _start_ready(self):
+        started = []
+        while self._queue and self._running < self.max_concurrent:
+            run = self._queue.popleft()
+            run.state = RUNNING
+            run.started = time.time()
+            self._running += 1
+            threading.Thread(target=self._execute, args=(run,), name=f"run-{run.id}", daemon=True).start()
+            started.append(run)
+        return started
+
+    def _execute(self, run):
+        returncode = None
+        error = None
+        try:
+            returncode = run.target(run)
+        except Exception as exc:
+            error = exc
+        with self._lock:
+            self._running -= 1
+            run.returncode = returncode
+            run.error = error
+            run.processes = []
+            run.state = STOPPED if run.stop_requested else FINISHED
+            run.ended = time.time()
+            if run.forgotten:
+                self._runs.pop(run.id, None)
+            started = self._start_ready()
+        self._notify([run] + started)
+
+    def _notify(self, runs):
+        if not self.on_change:
+            return
+        for run in runs:
+            try:
+                self.on_change(run)
+            except Exception as exc:
+                print(f"[runs] {exc}")
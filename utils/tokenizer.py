@@ -0,0 +1,165 @@
+import re
+
+from core.languages import LANGUAGES
+
+
+TOKEN_KEYWORD = "keyword"
+TOKEN_FUNCTION = "function"
+TOKEN_NUMBER = "number"
+TOKEN_STRING = "string"
+TOKEN_COMMENT = "comment"
+
+IDENTIFIER_PATTERN = r"[A-Za-z_][A-Za-z0-9_]*"
+
+# Block state 0 means "outside any multi-line construct"; state N (N >= 1)
+# means the line ends inside the N-th entry of Tokenizer.block_delimiters.
+STATE_DEFAULT = 0
+
+_TOKENIZERS = {}
+
+
+class Tokenizer:
+    """Single-pass tokenizer compiled once from a LANGUAGES entry."""
+
+    def __init__(self, language_config):
+        self.config = language_config
+        self._keywords = set(language_config.get("keywords", []))
+        self._functions = set(language_config.get("functions", []))
+        self.block_delimiters = self._collect_block_delimiters()
+        self._pattern = self._compile()
+
+    def _collect_block_delimiters(self):
+        cfg = self.config
+        delimiters = []
+        block_comment = cfg.get("block_comment")
+        if block_comment and len(block_comment) == 2:
+            delimiters.append((block_comment[0], block_comment[1], TOKEN_COMMENT))
+        for pair in cfg.get("multiline_strings", []) or []:
+            if pair and len(pair) == 2:
+                delimiters.append((pair[0], pair[1], TOKEN_STRING))
+        return delimiters
+
+    def _compile(self):
+        cfg = self.config
+        parts = []
+
+        # Longest openers first so "--[[" wins over "--" and '"""' over '"'.
+        order = sorted(range(len(self.block_delimiters)), key=lambda i: len(self.block_delimiters[i][0]), reverse=True)
+        for index in order:
+            opener = self.block_delimiters[index][0]
+            parts.append(f"(?P<block{index + 1}>{re.escape(opener)})")
+
+        comment_prefix = cfg.get("comment_prefix")
+        if comment_prefix:
+            parts.append(f"(?P<comment>{re.escape(comment_prefix)}.*)")
+
+        quotes = sorted(set(cfg.get("string_quotes", [])), key=len, reverse=True)
+        string_alts = []
+        for quote in quotes:
+            if not quote or len(quote) > 1:
+                continue
+            q = re.escape(quote)
+            string_alts.append(f"{q}(?:[^{q}\\\\]|\\\\.)*{q}")
+        if string_alts:
+            parts.append("(?P<string>" + "|".join(string_alts) + ")")
+
+        number_pattern = cfg.get("number_pattern")
+        if number_pattern:
+            parts.append(f"(?P<number>{number_pattern})")
+
+        # Entries such as "console.log" or "empty?" are not plain identifiers,
+        # so they are tried as literals before the generic identifier rule.
+        special = [w for w in self._keywords | self._functions if not re.fullmatch(IDENTIFIER_PATTERN, w)]
+        if special:
+            special.sort(key=len, reverse=True)
+            alts = "|".join(re.escape(w) for w in special)
+            parts.append(f"(?P<special>\\b(?:{alts})(?![A-Za-z0-9_]))")
+
+        parts.append(f"(?P<word>{IDENTIFIER_PATTERN})")
+        return re.compile("|".join(parts))
+
+    def _classify_word(self, word):
+        if word in self._keywords:
+            return TOKEN_KEYWORD
+        if word in self._functions:
+            return TOKEN_FUNCTION
+        return None
+
+    def _find_block_end(self, text, pos, state):
+        """Return the position right after the closing delimiter of state,
+        or -1 when the block continues past the end of the line."""
+        closer = self.block_delimiters[state - 1][1]
+        end = text.find(closer, pos)
+        if end == -1:
+            return -1
+        return end + len(closer)
+
+    def tokenize(self, text, state=STATE_DEFAULT):
+        """Tokenize one line starting in the given block state.
+
+        Returns (spans, end_state) where spans is a list of
+        (start, length, token_type).
+        """
+        spans = []
+        pos = 0
+        if STATE_DEFAULT < state <= len(self.block_delimiters):
+            kind = self.block_delimiters[state - 1][2]
+            pos = self._find_block_end(text, 0, state)
+            if pos == -1:
+                if text:
+                    spans.append((0, len(text), kind))
+                return spans, state
+            spans.append((0, pos, kind))
+
+        search = self._pattern.search
+        while True:
+            match = search(text, pos)
+            if match is None:
+                return spans, STATE_DEFAULT
+            kind = match.lastgroup
+            start = match.start()
+            pos = match.end()
+            if kind.startswith("block"):
+                block_state = int(kind[5:])
+                kind = self.block_delimiters[block_state - 1][2]
+                end = self._find_block_end(text, pos, block_state)
+                if end == -1:
+                    spans.append((start, len(text) - start, kind))
+                    return spans, block_state
+                pos = end
+            elif kind == "word" or kind == "special":
+                kind = self._classify_word(match.group())
+                if kind is None:
+                    continue
+            if pos > start:
+                spans.append((start, pos - start, kind))
+            elif pos >= len(text):
+                return spans, STATE_DEFAULT
+            else:
+                pos += 1
+
+    def tokenize_lines(self, lines, state=STATE_DEFAULT):
+        """Tokenize consecutive lines, threading the block state through.
+
+        Returns one (text, start_state, spans, end_state) entry per line.
+        Safe to call from a worker thread.
+        """
+        entries = []
+        tokenize = self.tokenize
+        for line in lines:
+            spans, end_state = tokenize(line, state)
+            entries.append((line, state, spans, end_state))
+            state = end_state
+        return entries
+
+
+def get_tokenizer(language_id):
+    language_config = LANGUAGES.get(language_id)
+    if not language_config:
+        return None
+    tokenizer = _TOKENIZERS.get(language_id)
+    # Extensions may replace a LANGUAGES entry at runtime; recompile if so.
+    if tokenizer is None or tokenizer.config is not language_config:
+        tokenizer = Tokenizer(language_config)
+        _TOKENIZERS[language_id] = tokenizer
+    return tokenizer
@@ -0,0 +1,200 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from utils.background import CoalescingWorker
+
+
+MAX_ENTRIES = 2000
+# A word's use count halves after this many seconds without being used.
+HALF_LIFE = 14 * 24 * 3600
+# Records between two background flushes of a workspace store.
+FLUSH_EVERY = 25
+
+
+class UsageStats:
+    """Recency and decayed frequency of the words used in one language.
+
+    Entries are kept in an OrderedDict ordered by last use, so recording a
+    word and evicting the least recently used one are both O(1). Each entry
+    is (use_index, count, timestamp): use_index is the value of the shared
+    counter when the word was last used, and count decays with HALF_LIFE.
+    """
+
+    def __init__(self, counter=0, entries=(), capacity=MAX_ENTRIES, on_record=None):
+        self.counter = counter
+        self.capacity = capacity
+        self.on_record = on_record
+        self._entries = OrderedDict()
+        self._copy = None
+        for word, index, count, timestamp in sorted(entries, key=lambda entry: entry[1]):
+            self._entries[word] = (index, count, timestamp)
+        while len(self._entries) > capacity:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def record(self, word, now=None):
+        now = time.time() if now is None else now
+        self.counter += 1
+        entry = self._entries.pop(word, None)
+        count = self._decayed(entry, now) + 1.0 if entry else 1.0
+        self._entries[word] = (self.counter, count, now)
+        if len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+        self._copy = None
+        if self.on_record:
+            self.on_record()
+
+    def recency(self, word):
+        """Use index of the last use of word, or None."""
+        entry = self._entries.get(word)
+        return entry[0] if entry else None
+
+    def frequency(self, word, now=None):
+        entry = self._entries.get(word)
+        if not entry:
+            return 0.0
+        return self._decayed(entry, time.time() if now is None else now)
+
+    def words(self):
+        return list(self._entries)
+
+    def copy(self):
+        """Detached copy, for reading on another thread while this one records.
+
+        The copy is shared until the next record(), so callers must not
+        record into it; asking again in between costs nothing.
+        """
+        if self._copy is None:
+            stats = UsageStats(self.counter, capacity=self.capacity)
+            stats._entries = OrderedDict(self._entries)
+            self._copy = stats
+        return self._copy
+
+    def snapshot(self):
+        return {
+            "counter": self.counter,
+            "words": [[word, index, round(count, 4), round(timestamp)] for word, (index, count, timestamp) in self._entries.items()],
+        }
+
+    @staticmethod
+    def _decayed(entry, now):
+        _index, count, timestamp = entry
+        age = max(0.0, now - timestamp)
+        return count * math.pow(0.5, age / HALF_LIFE)
+
+
+def usage_store_path(root_path):
+    return os.path.join(root_path, ".lcoder", "usage.json")
+
+
+class UsageStore:
+    """Per-language UsageStats of the open workspace, persisted under .lcoder/.
+
+    The file is read on the first stats() call after set_root(). Records are
+    written back by a background worker every FLUSH_EVERY records, and
+    synchronously by flush() (on workspace switch and on exit). Without a
+    workspace the stats are kept in memory only.
+    """
+
+    def __init__(self, log_callback=None):
+        self.log_callback = log_callback
+        self._root = None
+        self._stats = None
+        self._pending = 0
+        self._sequence = 0
+        self._written = {}
+        self._write_lock = threading.Lock()
+        self._writer = CoalescingWorker(self._write, name="usage-stats")
+
+    @property
+    def root_path(self):
+        return self._root
+
+    def set_root(self, root_path):
+        root_path = os.path.abspath(root_path) if root_path else None
+        if root_path == self._root:
+            return
+        self.flush()
+        self._root = root_path
+        self._stats = None
+        self._pending = 0
+
+    def stats(self, language_id):
+        if self._stats is None:
+            self._stats = self._load()
+        stats = self._stats.get(language_id)
+        if stats is None:
+            stats = UsageStats(on_record=self._on_record)
+            self._stats[language_id] = stats
+        return stats
+
+    def flush(self):
+        if self._root and self._stats is not None and self._pending:
+            self._pending = 0
+            self._write(self._root, *self._snapshot())
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+
+    def _snapshot(self):
+        self._sequence += 1
+        data = {language_id: stats.snapshot() for language_id, stats in self._stats.items() if len(stats)}
+        return data, self._sequence
+
+    def _on_record(self):
+        self._pending += 1
+        if self._root and self._pending >= FLUSH_EVERY:
+            self._pending = 0
+            # The snapshot is taken here, on the thread that records words.
+            self._writer.submit(self._root, *self._snapshot())
+
+    def _load(self):
+        if not self._root:
+            return {}
+        path = usage_store_path(self._root)
+        try:
+            if not os.path.exists(path):
+                return {}
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return {
+                language_id: UsageStats(
+                    int(entry.get("counter") or 0),
+                    [tuple(item) for item in entry.get("words") or []],
+                    on_record=self._on_record,
+                )
+                for language_id, entry in data.items()
+            }
+        except Exception as exc:
+            self._log(f"[usage] Could not read {path}: {exc}\n")
+            return {}
+
+    def _write(self, root_path, data, sequence):
+        path = usage_store_path(root_path)
+        with self._write_lock:
+            # A queued background write must not replace a newer flush().
+            if sequence <= self._written.get(root_path, 0):
+                return
+            self._written[root_path] = sequence
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                temp_path = path + ".tmp"
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, separators=(",", ":"))
+                os.replace(temp_path, path)
+            except Exception as exc:
+                self._log(f"[usage] Could not write {path}: {exc}\n")
+
+    def _log(self, message):
+        if callable(self.log_callback):
+            try:
+                self.log_callback(message)
+            except Exception:
+                pass
@@ -0,0 +1,111 @@
+import threading
+
+from core.languages import LANGUAGES
+from utils.background import CoalescingWorker
+from utils.completion_index import CompletionIndex
+from utils.fuzzy import FuzzyMatcher
+
+
+class LanguageVocabulary:
+    """Completion words of one language that every editor can share.
+
+    Holds the keywords, functions and snippets of a LANGUAGES entry plus the
+    workspace symbols of that language, indexed once. Instances are never
+    modified after construction; editors keep their document words in a
+    separate index and merge the two at query time.
+    """
+
+    def __init__(self, language_config, workspace_words=(), workspace_definitions=frozenset()):
+        self.snippets = dict(language_config.get("snippets", {}) or {})
+        self.keywords = frozenset(language_config.get("keywords", []))
+        self.functions = frozenset(language_config.get("functions", []))
+        self.workspace_definitions = workspace_definitions
+        words = set(self.keywords | self.functions)
+        words.update(self.snippets)
+        words.update(workspace_words)
+        self.index = CompletionIndex(words, static_score=self.static_score)
+        # Indexed here, on the builder thread, rather than under _fuzzy_lock
+        # by the first fuzzy query.
+        self._fuzzy = FuzzyMatcher()
+        self._fuzzy.prepare(self.index.words)
+        self._fuzzy_lock = threading.Lock()
+
+    def static_score(self, word):
+        score = 0.0
+        if word in self.snippets:
+            score += 6.0
+        if word in self.keywords:
+            score += 2.0
+        if word in self.functions:
+            score += 3.0
+        if word in self.workspace_definitions:
+            score += 1.0
+        score -= len(word) * 0.01
+        return score
+
+    def fuzzy_match(self, query, deadline=None):
+        # Completion workers of several editors may query at once.
+        with self._fuzzy_lock:
+            return self._fuzzy.match(query, self.index.words, deadline)
+
+
+_VOCABULARIES = {}
+_BUILDERS = {}
+_LISTENERS = {}
+_lock = threading.Lock()
+
+
+def get_vocabulary(language_id, workspace_index=None, on_rebuilt=None):
+    """Shared vocabulary for language_id, rebuilt only when its inputs change.
+
+    The cache is keyed by language id and invalidated when the LANGUAGES entry
+    is replaced (extensions may do so at runtime) or the workspace index moves
+    to a new revision. Sorting and scoring every workspace word takes a while,
+    so a stale vocabulary is rebuilt on a background thread: until then the
+    previous one is returned (or, the first time, one without workspace
+    words), and on_rebuilt() is called on that thread once the new one is in
+    the cache.
+    """
+    language_config = LANGUAGES.get(language_id) or LANGUAGES.get("python") or {}
+    revision = workspace_index.revision if workspace_index is not None else None
+    with _lock:
+        cached = _VOCABULARIES.get(language_id)
+        if cached is not None and cached[0] is language_config and cached[1] is workspace_index:
+            if cached[2] == revision:
+                return cached[3]
+        else:
+            cached = (language_config, workspace_index, None, LanguageVocabulary(language_config))
+            _VOCABULARIES[language_id] = cached
+            if workspace_index is None:
+                return cached[3]
+        if on_rebuilt is not None and on_rebuilt not in _LISTENERS.setdefault(language_id, []):
+            _LISTENERS[language_id].append(on_rebuilt)
+        builder = _BUILDERS.get(language_id)
+        if builder is None:
+            builder = _BUILDERS[language_id] = CoalescingWorker(_build_vocabulary, name=f"vocabulary-{language_id}")
+    builder.submit(language_id, language_config, workspace_index)
+    return cached[3]
+
+
+def _build_vocabulary(language_id, language_config, workspace_index):
+    revision = workspace_index.revision
+    with _lock:
+        cached = _VOCABULARIES.get(language_id)
+        if cached is not None and cached[0] is language_config and cached[1] is workspace_index:
+            if cached[2] == revision:
+                # Queued while the previous build ran, which got this revision.
+                return
+    vocabulary = LanguageVocabulary(
+        language_config,
+        workspace_index.words(language_id),
+        workspace_index.definitions(language_id),
+    )
+    with _lock:
+        cached = _VOCABULARIES.get(language_id)
+        if cached is not None and (cached[0] is not language_config or cached[1] is not workspace_index):
+            # The inputs were replaced while building; a newer request follows.
+            return
+        _VOCABULARIES[language_id] = (language_config, workspace_index, revision, vocabulary)
+        listeners = _LISTENERS.pop(language_id, [])
+    for listener in listeners:
+        listener()
@@ -0,0 +1,98 @@
+import re
+from collections import Counter
+
+
+WORD_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]{2,}")
+ATTR_PATTERN = re.compile(r"\b([A-Za-z_][A-Za-z0-9_]*)\.([A-Za-z_][A-Za-z0-9_]*)")
+# Every match of either pattern is made of these characters only.
+_MATCH_CHARS = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_."
+
+
+class WordIndex:
+    """Word counts and base.attr pairs of a document, maintained per line.
+
+    replace_lines() only rescans the lines touched by an edit, so keeping the
+    index current costs time proportional to the edit, not the document.
+    """
+
+    def __init__(self):
+        self.lines = []
+        self.word_counts = Counter()
+        # base -> Counter(attr -> occurrences)
+        self.attr_map = {}
+        self.vocabulary_changed = False
+        # Words whose count changed since the owner last cleared this set.
+        self.touched_words = set()
+
+    def reset(self, lines):
+        self.lines = []
+        self.word_counts.clear()
+        self.attr_map.clear()
+        self.vocabulary_changed = True
+        self.replace_lines(0, 0, lines)
+
+    def replace_lines(self, first, removed, new_lines):
+        """Replace lines[first:first + removed] with new_lines."""
+        old_lines = self.lines[first:first + removed]
+        self.lines[first:first + removed] = new_lines
+        if old_lines == new_lines:
+            return
+        # Words never span lines, so each side can be scanned in one call.
+        old_text = "\n".join(old_lines)
+        new_text = "\n".join(new_lines)
+        # Only net changes are applied: a word still on the edited line
+        # keeps its count and does not leave the vocabulary for a moment.
+        self._apply_words(self._difference(WORD_PATTERN.findall(new_text), WORD_PATTERN.findall(old_text)))
+        self._apply_attrs(self._difference(ATTR_PATTERN.findall(new_text), ATTR_PATTERN.findall(old_text)))
+
+    def append_text(self, text):
+        """Append text at the end of the last line, splitting it at newlines.
+
+        Matches never contain other characters than _MATCH_CHARS, so only
+        the run of them ending the last line is rescanned; a long line
+        appended in pieces costs time proportional to the pieces.
+        """
+        if not self.lines:
+            self.lines.append("")
+        head, *more = text.split("\n")
+        last = self.lines[-1]
+        old_tail = last[len(last.rstrip(_MATCH_CHARS)):]
+        new_tail = old_tail + head
+        self.lines[-1] = last + head
+        self._apply_words(self._difference(WORD_PATTERN.findall(new_tail), WORD_PATTERN.findall(old_tail)))
+        self._apply_attrs(self._difference(ATTR_PATTERN.findall(new_tail), ATTR_PATTERN.findall(old_tail)))
+        if more:
+            self.replace_lines(len(self.lines), 0, more)
+
+    @staticmethod
+    def _difference(new_items, old_items):
+        delta = Counter(new_items)
+        delta.subtract(old_items)
+        return {item: count for item, count in delta.items() if count}
+
+    def _apply_words(self, delta):
+        word_counts = self.word_counts
+        self.touched_words.update(delta)
+        for word, count in delta.items():
+            total = word_counts.get(word, 0) + count
+            if total > 0:
+                if word not in word_counts:
+                    self.vocabulary_changed = True
+                word_counts[word] = total
+            elif word in word_counts:
+                del word_counts[word]
+                self.vocabulary_changed = True
+
+    def _apply_attrs(self, delta):
+        attr_map = self.attr_map
+        for (base, attr), count in delta.items():
+            attrs = attr_map.get(base)
+            if attrs is None:
+                attrs = attr_map[base] = Counter()
+            total = attrs.get(attr, 0) + count
+            if total > 0:
+                attrs[attr] = total
+            else:
+                attrs.pop(attr, None)
+                if not attrs:
+                    del attr_map[base]
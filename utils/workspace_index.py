@@ -0,0 +1,365 @@
+import ast
+import hashlib
+import multiprocessing
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import chain
+
+from core.languages import LANGUAGES
+from utils.index_store import IndexStore
+
+
+SKIPPED_DIRS = {"__pycache__", "node_modules", "site-packages"}
+MAX_FILE_SIZE = 1024 * 1024
+# Files per task sent to the process pool; smaller updates are parsed inline.
+BATCH_SIZE = 64
+MAX_WORKERS = 4
+
+IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]{2,}")
+# Names following these words are treated as definitions by the token scan.
+DEFINITION_PATTERN = re.compile(
+    r"\b(?:def|class|function|func|fn|struct|interface|enum|local|const|let|var)\s+([A-Za-z_][A-Za-z0-9_]*)"
+)
+
+
+def _language_by_extension():
+    mapping = {}
+    for language_id, config in LANGUAGES.items():
+        for ext in config.get("extensions", []):
+            mapping.setdefault(ext.lower(), language_id)
+    return mapping
+
+
+def _python_symbols(source):
+    tree = ast.parse(source)
+    identifiers = set()
+    definitions = set()
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            definitions.add(node.name)
+        elif isinstance(node, ast.Name):
+            identifiers.add(node.id)
+            if isinstance(node.ctx, ast.Store):
+                definitions.add(node.id)
+        elif isinstance(node, ast.Attribute):
+            identifiers.add(node.attr)
+        elif isinstance(node, ast.arg):
+            identifiers.add(node.arg)
+        elif isinstance(node, ast.alias):
+            definitions.add((node.asname or node.name).split(".")[0])
+        elif isinstance(node, ast.keyword) and node.arg:
+            identifiers.add(node.arg)
+    identifiers |= definitions
+    return identifiers, definitions
+
+
+def _token_symbols(source, language_id):
+    keywords = set(LANGUAGES.get(language_id, {}).get("keywords", []))
+    identifiers = set(IDENTIFIER_PATTERN.findall(source)) - keywords
+    definitions = set(DEFINITION_PATTERN.findall(source)) - keywords
+    return identifiers, definitions
+
+
+def extract_symbols(path, language_id, known_hash=None):
+    """Return (hash, identifiers, definitions) of a source file.
+
+    The symbols are sorted tuples, or None when the content hash equals
+    known_hash and the caller's previous symbols are still valid.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return "", (), ()
+    digest = hashlib.sha1(data).hexdigest()
+    if digest == known_hash:
+        return digest, None, None
+    source = data.decode("utf-8", errors="replace")
+    identifiers = definitions = None
+    if language_id == "python":
+        try:
+            identifiers, definitions = _python_symbols(source)
+        except (SyntaxError, ValueError, RecursionError):
+            pass
+    if identifiers is None:
+        identifiers, definitions = _token_symbols(source, language_id)
+    identifiers = {name for name in identifiers if len(name) >= 3}
+    return digest, tuple(sorted(identifiers)), tuple(sorted(definitions))
+
+
+def _extract_batch(batch):
+    # Runs in a pool process: batch is [(path, language_id, mtime, size, known_hash)].
+    return [
+        (path, language_id, mtime, size, *extract_symbols(path, language_id, known_hash))
+        for path, language_id, mtime, size, known_hash in batch
+    ]
+
+
+class WorkspaceIndex:
+    """Identifiers and definitions of every source file under a workspace.
+
+    The index is built on a background thread; files are parsed in a process
+    pool so parsing does not compete with the GUI thread for the GIL. Files
+    whose mtime and size are unchanged are not parsed again, nor are files
+    whose content hash is unchanged. The index is persisted in an IndexStore
+    under .lcoder/, so reopening a workspace only parses what changed since.
+    on_updated is called from the worker thread after each completed update.
+    """
+
+    def __init__(self, on_updated=None, log_callback=None):
+        self.on_updated = on_updated
+        self.log_callback = log_callback
+        self._lock = threading.Lock()
+        self._root = None
+        self._store = None
+        self._generation = 0
+        # path -> (language_id, mtime, size, hash, identifiers, definitions)
+        self._files = {}
+        self._identifiers = {}
+        self._definitions = {}
+        self._frozen = {}
+        self.revision = 0
+
+    @property
+    def root_path(self):
+        return self._root
+
+    def set_root(self, root_path):
+        root_path = os.path.abspath(root_path) if root_path else None
+        with self._lock:
+            if root_path == self._root:
+                return
+            self._generation += 1
+            self._root = root_path
+            self._store = IndexStore(root_path) if root_path else None
+            self._files = {}
+            self._identifiers = {}
+            self._definitions = {}
+            self._frozen = {}
+            self.revision += 1
+            generation = self._generation
+        if root_path:
+            self._start(self._build, generation, root_path)
+
+    def refresh(self):
+        with self._lock:
+            generation = self._generation
+            root_path = self._root
+        if root_path:
+            self._start(self._build, generation, root_path)
+
+    def update_files(self, paths):
+        with self._lock:
+            generation = self._generation
+            root_path = self._root
+        if root_path:
+            self._start(self._update_paths, generation, root_path, list(paths))
+
+    def close(self):
+        with self._lock:
+            self._generation += 1
+            self._root = None
+
+    def words(self, language_id):
+        """Frozen set of identifiers seen in files of language_id."""
+        return self._frozen_names("identifiers", language_id)
+
+    def definitions(self, language_id):
+        """Frozen set of names defined in files of language_id."""
+        return self._frozen_names("definitions", language_id)
+
+    def _frozen_names(self, kind, language_id):
+        # Editors of the same language share one snapshot per revision.
+        with self._lock:
+            key = (kind, language_id)
+            cached = self._frozen.get(key)
+            if cached is None or cached[0] != self.revision:
+                counts = self._identifiers if kind == "identifiers" else self._definitions
+                cached = (self.revision, frozenset(counts.get(language_id, ())))
+                self._frozen[key] = cached
+            return cached[1]
+
+    def _start(self, target, *args):
+        threading.Thread(target=target, args=args, daemon=True).start()
+
+    def _log(self, message):
+        if callable(self.log_callback):
+            try:
+                self.log_callback(message)
+            except Exception:
+                pass
+
+    def _is_current(self, generation):
+        return generation == self._generation
+
+    def _scan(self, root_path, generation):
+        by_ext = _language_by_extension()
+        found = {}
+        stack = [root_path]
+        while stack:
+            if not self._is_current(generation):
+                return None
+            folder = stack.pop()
+            try:
+                entries = list(os.scandir(folder))
+            except OSError:
+                continue
+            if any(entry.name == "pyvenv.cfg" for entry in entries):
+                continue
+            for entry in entries:
+                name = entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not name.startswith(".") and name not in SKIPPED_DIRS:
+                            stack.append(entry.path)
+                        continue
+                    language_id = by_ext.get(os.path.splitext(name)[1].lower())
+                    if not language_id:
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                if stat.st_size <= MAX_FILE_SIZE:
+                    found[entry.path] = (language_id, stat.st_mtime, stat.st_size)
+        return found
+
+    def _build(self, generation, root_path):
+        try:
+            with self._lock:
+                known = dict(self._files)
+                store = self._store
+            if not known:
+                known = self._load_store(generation, store)
+            found = self._scan(root_path, generation)
+            if found is None:
+                return
+            stale = []
+            for path, (language_id, mtime, size) in found.items():
+                entry = known.get(path)
+                if entry is None or entry[0] != language_id:
+                    stale.append((path, language_id, mtime, size, None))
+                elif entry[1:3] != (mtime, size):
+                    stale.append((path, language_id, mtime, size, entry[3]))
+            removed = [path for path in known if path not in found]
+            self._apply(generation, self._extract(stale, generation), removed)
+        except Exception as exc:
+            self._log(f"[index] Failed to index {root_path}: {exc}\n")
+
+    def _load_store(self, generation, store):
+        if store is None:
+            return {}
+        try:
+            entries = store.load()
+        except Exception as exc:
+            self._log(f"[index] Could not read {store.path}: {exc}\n")
+            return {}
+        results = [(path, *entry) for path, entry in entries.items()]
+        if not self._apply(generation, results, (), persist=False):
+            return {}
+        return entries
+
+    def _update_paths(self, generation, root_path, paths):
+        by_ext = _language_by_extension()
+        stale = []
+        removed = []
+        for path in paths:
+            path = os.path.abspath(path)
+            if not path.startswith(root_path + os.sep):
+                continue
+            language_id = by_ext.get(os.path.splitext(path)[1].lower())
+            try:
+                stat = os.stat(path)
+            except OSError:
+                removed.append(path)
+                continue
+            if language_id and stat.st_size <= MAX_FILE_SIZE:
+                with self._lock:
+                    entry = self._files.get(path)
+                known_hash = entry[3] if entry and entry[0] == language_id else None
+                stale.append((path, language_id, stat.st_mtime, stat.st_size, known_hash))
+        self._apply(generation, self._extract(stale, generation), removed)
+
+    def _extract(self, stale, generation):
+        if len(stale) < 2 * BATCH_SIZE:
+            return _extract_batch(stale)
+        batches = [stale[i:i + BATCH_SIZE] for i in range(0, len(stale), BATCH_SIZE)]
+        results = []
+        workers = max(1, min(MAX_WORKERS, (os.cpu_count() or 2) - 1))
+        try:
+            # spawn: forking a process that runs Qt threads is not safe.
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                futures = [pool.submit(_extract_batch, batch) for batch in batches]
+                for future in as_completed(futures):
+                    if not self._is_current(generation):
+                        for pending in futures:
+                            pending.cancel()
+                        return []
+                    results.extend(future.result())
+        except Exception as exc:
+            self._log(f"[index] Process pool unavailable, indexing in-thread: {exc}\n")
+            results = []
+            for batch in batches:
+                if not self._is_current(generation):
+                    return []
+                results.extend(_extract_batch(batch))
+        return results
+
+    def _apply(self, generation, results, removed, persist=True):
+        with self._lock:
+            if not self._is_current(generation):
+                return False
+            store = self._store
+            dropped = [path for path in removed if path in self._files]
+            for path in dropped:
+                self._remove_file(path)
+            written = {}
+            added_identifiers = defaultdict(list)
+            added_definitions = defaultdict(list)
+            symbols_changed = bool(dropped)
+            for path, language_id, mtime, size, digest, identifiers, definitions in results:
+                previous = self._files.get(path)
+                if identifiers is None:
+                    # Touched but identical content: keep the parsed symbols.
+                    if previous is None:
+                        continue
+                    entry = (language_id, mtime, size, digest, previous[4], previous[5])
+                    self._files[path] = entry
+                    written[path] = entry
+                    continue
+                if previous is not None:
+                    self._remove_file(path)
+                entry = (language_id, mtime, size, digest, identifiers, definitions)
+                self._files[path] = entry
+                written[path] = entry
+                added_identifiers[language_id].append(identifiers)
+                added_definitions[language_id].append(definitions)
+                symbols_changed = True
+            # One bulk update per language keeps loading a large store fast.
+            for counts, added in ((self._identifiers, added_identifiers), (self._definitions, added_definitions)):
+                for language_id, groups in added.items():
+                    counts.setdefault(language_id, Counter()).update(chain.from_iterable(groups))
+            if symbols_changed:
+                self.revision += 1
+        if persist and store is not None and (written or dropped):
+            try:
+                store.save(written, dropped)
+            except Exception as exc:
+                self._log(f"[index] Could not write {store.path}: {exc}\n")
+        if symbols_changed and callable(self.on_updated):
+            self.on_updated()
+        return True
+
+    def _remove_file(self, path):
+        language_id, _mtime, _size, _hash, identifiers, definitions = self._files.pop(path)
+        for counts, names in ((self._identifiers, identifiers), (self._definitions, definitions)):
+            counter = counts.get(language_id)
+            if counter is None:
+                continue
+            counter.subtract(names)
+            for name in names:
+                if counter[name] <= 0:
+                    del counter[name]